@@ -1,9 +1,18 @@
 import heapq
+import os
 import random
+import sys
 from collections import defaultdict
 
 from matplotlib import pyplot as plt
 
+# the dataset loader is shared with the modules in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from loader import load_dataset
+from infectionKernel import infection_batches, infection_curve, infected_nodes
+from monteCarlo import python_random, sample_votes
+from dominators import dominated_counts
+
 # --------------------------------------------------------------Class Node--------------------------------------------------------
 
 PROB_OF_BEING_INFECTED = 0.2
@@ -40,116 +49,83 @@ def print_tree(tree, spaces=0):
 
 # --------------------------------------------------------------Forward Simulation---------------------------------------------------------------
 
-def forward_forest (seed_set, filename, prob):
+def forward_forest (seed_set, filename, prob, rng=random):
     '''
     Simulation of the infection to find the forest
-    Input: graph and seedset
+    Input: graph and seedset, rng is the random generator of the simulation
     Output: forest of infection
     '''
 
     # final forest of infection
     forest = list(Node(seed,-1) for seed in seed_set)
-    infected = set(seed_set)
-
-    # queue of tuples (src, message state)
-    messages = defaultdict(list)
-
-    last_unixts = None
-
-    file = (row for row in open(filename, 'r'))
-    filtered_edges = [(int(src), int(dst), int(unixts)) for src, dst, unixts in [line.split(" ") for line in file] if int(dst) not in seed_set]
 
-    for src, dst, unixts in filtered_edges:
-        
-        # check if the last_unixts is None or equal to the current unixts
-        # if is equal, we'll continue to add elements on the queue
-        # if is different, we'll clear the queue
-        if last_unixts != None and last_unixts != unixts:
-            create_infection_tree(messages, infected, last_unixts, forest, prob)
-        
-        # if the src is infected, tthe message is infected
-        if src in infected:
-            state = 1
-        else:
-            state = 0
+    # index of the infected nodes: the id of each infected node is mapped to its node in the forest
+    infected = {tree.id: tree for tree in forest}
 
-        # add the tuple (src, message state) to the queue
-        # if if the destination is already in the list, we'll add the tuple to the queue
-        messages[dst].append((src, state))
+    # the messages sent to the seeds are ignored by create_infection_tree, since the seeds are already infected
+    dataset = load_dataset(filename)
+    src_ids, dst_ids, timestamps = dataset.columns()
 
-        last_unixts = unixts
+    for start, end in dataset.batches():
+        create_infection_tree(src_ids[start:end], dst_ids[start:end], infected, timestamps[start], prob, rng)
 
-    create_infection_tree(messages, infected, last_unixts, forest, prob) # type: ignore
     return forest
 
-def create_infection_tree (messages : dict[int, list[tuple[int, int]]], infected : set[int], last_unixts : int, forest : list[Node], prob: float):
+def create_infection_tree (src_ids : list[int], dst_ids : list[int], infected : dict[int, Node], last_unixts : int, prob: float, rng=random):
     '''
-    Input: the list of messages, the list of infected nodes, the last timestamp and the forest of infection
+    Input: the senders and the receivers of the messages of a batch, the index of the infected nodes (id -> node of the forest) and the timestamp of the batch
     Output: the forest of infection updated
     '''
-    
-    # messages is a dict[int, list[tuple[int, int]]]
-    # the key int is the dst
-    # the value list[tuple[int, int]] is a list of two value int:
-    #   - the src
-    #   - the state (infected or not)
 
-    for (dst, data) in messages.items():
+    # if no src is infected, no message of the batch is infected
+    if infected.keys().isdisjoint(src_ids):
+        return
+
+    # infected_messages[dst] is the list of (src, state) of the infected messages received by dst
+    # the states are computed before updating infected because all the messages of the batch are sent at the same time
+    infected_messages = defaultdict(list)
+    for src, dst in zip(src_ids, dst_ids):
+        if src in infected:
+            infected_messages[dst].append((src, 1))
+
+    for (dst, data) in infected_messages.items():
         if dst not in infected:
-            sum = 0
-            for (_, state) in data:
-                sum += state
-            prob_of_not_being_infected = pow((1 - prob), sum)
-            infection_result = random.uniform(0, 1)
-            """
-            data is the list of (src, state)
-            (_, state) = random.choice(data)
-            """
+            prob_of_not_being_infected = pow((1 - prob), len(data))
+            infection_result = rng.uniform(0, 1)
             if infection_result > prob_of_not_being_infected:
                 # if an infected message is randomly chosen, we add the new node to the forest
                 # as child of all the nodes that send an infected message to the new node
                 new_node = Node(dst, last_unixts)
-                add_infected_edges(new_node, infected, data, forest)
-    messages.clear()
+                add_infected_edges(new_node, infected, data)
 
 
-def add_infected_edges(node : Node, infected : set[int], list : list, forest : list[Node]):
+def add_infected_edges(node : Node, infected : dict[int, Node], list : list):
     '''
-    Input: the current node, the last timestamp, the list of infected nodes, the list of messages and the forest of infection
+    Input: the current node, the index of the infected nodes and the list of messages
     Output: the forest of infection with the new edges
     '''
 
     # find the father of the node for each infected message
     for (src, state) in list:
         if state == 1:
-            father_list = find_father(src, node.timestamp, forest)
+            father_list = find_father(src, node.timestamp, infected)
             if father_list:
                 for father in father_list:
                     father.add_child(node)
-                    infected.add(node.id)
+                    infected[node.id] = node
 
-def find_father(id : int, timestamp : int, forest : list[Node]):
+def find_father(id : int, timestamp : int, infected : dict[int, Node]):
     '''
-    function that takes in input the id of the node and the forest of infection
-    and return the father of the node that will be the node that has the same id of the node passed in input
-    and with the deepest level
+    function that takes in input the id of the node and the index of the infected nodes
+    and return the father of the node, that is the node of the forest with the same id of the node passed in input
+    if it has been infected before the timestamp
     '''
     father = set()
-    for tree in forest:
-        dfs(tree, id, timestamp, father)
+    tree = infected.get(id)
+    if tree is not None and tree.timestamp < timestamp:
+        father.add(tree)
     return father
 
-def dfs(tree : Node, id : int, timestamp : int, fathers : set[Node]):
-    '''
-    Input: the tree, the id of the node, the timestamp of the node and the list of the father
-    Output: the fathers of the node that will be the node that has the same id of the node passed in input
-    '''
-    if tree.id == id and tree.timestamp < timestamp:
-        # the take the node as possible father
-        fathers.add(tree)
-    for child in tree.children:
-        dfs(child, id, timestamp, fathers)
-
 # --------------------------------------------------------------Simulate Infection---------------------------------------------------------------
 
 def simulate_infection (seed_set, filename, plot : list[int], removed_nodes=[], prob: float = PROB_OF_BEING_INFECTED):
@@ -159,75 +135,25 @@ def simulate_infection (seed_set, filename, plot : list[int], removed_nodes=[],
     Output: number of infected nodes
     '''
 
-    infected = set(seed_set)
-
-    # queue of tuples (src, message state)
-    messages = defaultdict(list)
-
-    last_unixts = None
-
-    file = (row for row in open(filename, 'r'))
-    filtered_edges = [(int(src), int(dst), int(unixts)) for src, dst, unixts in [line.split(" ") for line in file] if int(src) not in removed_nodes and int(dst) not in removed_nodes]
-    for src, dst, unixts in filtered_edges:
+    dataset = load_dataset(filename)
+    keep = dataset.keep_mask(removed_nodes)
 
-        # check if the last_unixts is None or equal to the current unixts
-        # if is equal, we'll continue to add elements on the queue
-        # if is different, we'll clear the queue
-        if last_unixts != None and last_unixts != unixts:
-            spread_infection(messages, infected, prob)
-            plot.append(len(infected))
-
-        # if the src is infected, than the message is infected
-        if src in infected:
-            state = 1
-        else:
-            state = 0
-
-
-        # add the tuple (src, message state) to the queue
-        # if if the destination is already in the list, we'll add the tuple to the queue
-        messages[dst].append(state)
-
-        last_unixts = unixts
-        
-    spread_infection(messages, infected, prob)
-    plot.append(len(infected))
-    return infected
-
-def spread_infection (messages : dict[int, list[int]], infected : set[int], prob: float):
-    '''
-    Input:
-        - the list of messages and the list of infected nodes
-    
-    Output:
-        - the list of infected nodes updated
-    '''
-    
-    for (dst, states) in messages.items():
-        """
-        previous version in which we used to choose a random message and check if it was infected
-        random_message = random.choice(states)
-        if random_message == 1:
-            infected.add(dst) """
-        infected_messages = sum(states)
-        prob_of_not_being_infected = pow((1 - prob), infected_messages)
-        influence_result = random.uniform(0, 1)
-        if influence_result > prob_of_not_being_infected:
-            infected.add(dst)
-    messages.clear()
+    infected_at = infection_batches(dataset, seed_set, prob, keep=keep)
+    plot.extend(infection_curve(dataset, infected_at, keep))
+    return infected_nodes(infected_at)
 
 # --------------------------------------------------------------Choose Node---------------------------------------------------------------
 
-def random_path (forest):
+def random_path (forest, rng=random):
     '''
-    Input: forest of infection
+    Input: forest of infection and random generator
     Output: a random path in the forest
     '''
     path = []
-    tree = random.choice(forest)
+    tree = rng.choice(forest)
     path.append(tree)
     while tree.children != []:
-        tree = random.choice(tree.children)
+        tree = rng.choice(tree.children)
         path.append(tree)
     return path
 
@@ -251,31 +177,20 @@ def find_most_common_node (nodes: dict[int, int], budget: int):
     common_node_ids = [k for k, _ in heapq.nlargest(budget, top_nodes.items(), key=lambda x: x[1])]
     return set(common_node_ids)
 
-def minimize_infection(filename: str, seed_set: list, prob: float = PROB_OF_BEING_INFECTED):
+def path_votes (filename: str, seed_set: list, prob: float, replicates: int, seed_sequence) -> dict[int, int]:
     '''
-    function that return the attack set
+    task of the Monte Carlo runner: it samples replicates forests of infection, chooses a random path in each one
+    and counts how many times each node appears in the paths
     '''
-    times = 100
-    node_budget = 10 # budget of nodes to remove
+    rng = python_random(seed_sequence)
     nodes, already_found = {}, set() # list of nodes present in a random path and list of nodes already found in previous paths
-
-    set_plot = list()
-
-    fig, ax = plt.subplots(figsize=(5, 5))
-    
-
-    first_simulation = simulate_infection(seed_set, filename, set_plot, prob=prob)
-    plt.plot(set_plot, label="No preventive measures", color="blue")
-    print("first simulation: ", len(first_simulation))
-    first_infected = len(first_simulation)
-
-    for _ in range(times):
+    for _ in range(replicates):
 
         # find the forest of infection
-        forest = forward_forest(seed_set, filename, prob)
+        forest = forward_forest(seed_set, filename, prob, rng)
 
         # choose a random path
-        path = random_path(forest)
+        path = random_path(forest, rng)
 
         if len(path) > 1:
             # remove the last node in order to not consider the leaf node that is useless for the infection
@@ -284,18 +199,74 @@ def minimize_infection(filename: str, seed_set: list, prob: float = PROB_OF_BEIN
             # remove the first node in order to not consider the root node that is a seed node and
             # it is not possible to remove a seed node
             path.pop(0)
-    
 
         # count the nodes in the path
         count_nodes(path, nodes, already_found)
 
         forest.clear()
+    return nodes
+
+def blocking_scores (forest, seed_set) -> dict[int, int]:
+    '''
+    Input: forest of infection (a DAG, since a node is a child of all the nodes that have sent it an infected message) and seed set
+    Output: for each infected node that is not a seed, the number of nodes that are not infected anymore if it is removed,
+    that is the number of nodes that it dominates in the DAG (itself included)
+    '''
+    # the nodes of the DAG are numbered from 1 in the order in which they are found, the node 0 is a virtual root with an edge to each seed
+    index, nodes = {}, []
+    stack = list(forest)
+    while stack:
+        node = stack.pop()
+        if node.id not in index:
+            index[node.id] = len(nodes) + 1
+            nodes.append(node)
+            stack.extend(node.children)
+
+    successors = [[index[tree.id] for tree in forest]] + [[index[child.id] for child in node.children] for node in nodes]
+    counts = dominated_counts(successors)
+    return {node.id: counts[index[node.id]] for node in nodes if node.id not in seed_set}
+
+def dominator_votes (filename: str, seed_set: list, prob: float, replicates: int, seed_sequence) -> dict[int, int]:
+    '''
+    task of the Monte Carlo runner: it samples replicates forests of infection and sums the blocking scores of each node
+    '''
+    rng = python_random(seed_sequence)
+    nodes = defaultdict(int)
+    for _ in range(replicates):
+        forest = forward_forest(seed_set, filename, prob, rng)
+        for id, saved in blocking_scores(forest, set(seed_set)).items():
+            nodes[id] += saved
+    return dict(nodes)
+
+def minimize_infection(filename: str, seed_set: list, prob: float = PROB_OF_BEING_INFECTED, workers: int = 1, max_times: int = 100, scores: str = 'paths'):
+    '''
+    function that return the attack set
+    the forests are sampled by workers processes, until at most one of the best nodes changes or max_times forests have been sampled
+    with scores='paths' the nodes are the ones that appear the most times in a random path of each forest,
+    with scores='dominators' they are the ones that would save the most nodes in the sampled forests (see blocking_scores)
+    '''
+    times = 100
+    node_budget = 10 # budget of nodes to remove
+
+    set_plot = list()
+
+    fig, ax = plt.subplots(figsize=(5, 5))
+    
+
+    first_simulation = simulate_infection(seed_set, filename, set_plot, prob=prob)
+    plt.plot(set_plot, label="No preventive measures", color="blue")
+    print("first simulation: ", len(first_simulation))
+    first_infected = len(first_simulation)
+
+    task = dominator_votes if scores == 'dominators' else path_votes
+    nodes, paths = sample_votes(task, (filename, seed_set, prob), node_budget, times, max_times, workers)
+    print("sampled forests: ", paths)
 
     #print(nodes)
 
-    # find the node with the highest number of times in the path
+    # find the node with the highest number of times in the path (or the highest blocking score)
     action_set = find_most_common_node(nodes, node_budget)
-    print("nodes appearing the most times in the path: ", action_set)
+    print("nodes with the highest scores: ", action_set)
 
     # remove the node from the graph
     # we simulate the removal of the node by ignoring the edges that have the node as destination or source
@@ -1,53 +1,72 @@
 '''
 file that define the cc function in order to control the number of cc contained in a graph before removing the attack set and after
 removing it
+
+the static graph (the distinct pairs of nodes that exchange at least one message, without direction) is built once for each
+file and the components are found with a union-find, without recursion. the removed nodes stay in the graph as isolated nodes.
+the robustness curve of an attack set (the components after removing its nodes one at a time) is computed with a single
+union-find pass that adds the nodes back in reverse order, instead of finding the components again after each removal
 '''
 
-# ------------------------- class Node -------------------------
+import numpy as np
 
-class Graph:
-    # constructor
-    def __init__(self, directed=True):
-        self.directed = directed
-        
-        # initialize adjacency list
-        self.adjacency_list = dict()
-        
-    def add_edge(self, src, dst):
-        if not src in self.adjacency_list:
-            self.adjacency_list[src] = set()
-            
-        self.adjacency_list[src].add(dst)
-        
-        if not dst in self.adjacency_list:
-            self.adjacency_list[dst] = set()
-        
-        if not self.directed:
-            self.adjacency_list[dst].add(src)
-    
-    def add_node(self, node):
-        if not node in self.adjacency_list:
-            self.adjacency_list[node] = set()
+from loader import load_dataset
+
+# static graph of each file: nodes and the two endpoints of each edge
+_static_graphs = {}
+
+# ------------------------- class UnionFind -------------------------
+
+class UnionFind:
 
+    def __init__(self, nodes, num_nodes: int):
+        '''
+        init function of the class UnionFind
+        every node of nodes is a component, the ids go from 0 to num_nodes - 1
+        '''
+        self.parent = list(range(num_nodes))
+        self.size = [1] * num_nodes
+        self.components = len(nodes)
+        self.largest = 1 if len(nodes) > 0 else 0
+
+    def find(self, node: int) -> int:
+        '''
+        function that return the root of the component of node, halving the path
+        '''
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, u: int, v: int):
+        '''
+        function that merge the components of u and v, the smaller one is attached to the larger one
+        '''
+        u, v = self.find(u), self.find(v)
+        if u == v:
+            return
+        if self.size[u] < self.size[v]:
+            u, v = v, u
+        self.parent[v] = u
+        self.size[u] += self.size[v]
+        self.components -= 1
+        self.largest = max(self.largest, self.size[u])
 
 # ------------------------- functions -------------------------
 
-def create_graph_from_file(filename: str, attack_set : list = []):
-    G = Graph()
-    with open(filename, 'r') as f:
-        split_char = ' '
-        if filename == 'data/fb-forum.txt':
-            split_char = ','
-        for line in f:
-            src, dst, unixts = line.split(split_char)
-            src, dst, unixts = int(src), int(dst), int(unixts)
-            if src in attack_set:
-                G.add_node(src)
-            if dst in attack_set:
-                G.add_node(dst)
-            if src not in attack_set and dst not in attack_set:
-                G.add_edge(src, dst)
-    return G
+def static_graph(filename: str):
+    '''
+    function that return the static graph of the file, built only once
+    output: the sorted list of the nodes and the arrays with the endpoints of each edge (without duplicates and self loops)
+    '''
+    if filename not in _static_graphs:
+        dataset = load_dataset(filename)
+        u = np.minimum(dataset.src, dataset.dst).astype(np.int64)
+        v = np.maximum(dataset.src, dataset.dst).astype(np.int64)
+        pairs = np.unique(u[u != v] * dataset.num_nodes + v[u != v])
+        _static_graphs[filename] = (sorted(dataset.nodes()), pairs // dataset.num_nodes, pairs % dataset.num_nodes)
+    return _static_graphs[filename]
 
 def connected_components(filename: str, attack_set: list = []):
     '''
@@ -59,34 +78,16 @@ def connected_components(filename: str, attack_set: list = []):
     
     output:
         - counter: int, number of cc
+        - id: dict, dictionary saying each node from which component belong (the root of its component)
     '''
-    graph = create_graph_from_file(filename, attack_set)
-    id = dict()
-    for v in graph.adjacency_list.keys():
-        id[v] = 0
-    counter = 0
-    for v in graph.adjacency_list.keys():
-        if id[v] == 0:
-            counter += 1
-            cc_dfs(graph, counter, v, id)
-    return counter, id
-
-def cc_dfs(graph: Graph, counter: int, node: int, id: dict):
-    '''
-    function that count the number of cc in a graph
-    
-    input:
-        - graph: Graph, the network of nodes
-        - counter: int, number of the cc
-        - node: int, node that is going to be analyzed
-        - id: dict, dictionary saying each node from which component belong
-    
-    output: None
-    '''
-    id[node] = counter
-    for v in graph.adjacency_list[node]:
-        if id[v] == 0:
-            cc_dfs(graph, counter, v, id)
+    nodes, u, v = static_graph(filename)
+    removed = np.asarray(list(set(attack_set)), dtype=np.int64)
+    kept = ~(np.isin(u, removed) | np.isin(v, removed))
+
+    components = UnionFind(nodes, nodes[-1] + 1 if nodes else 0)
+    for src, dst in zip(u[kept].tolist(), v[kept].tolist()):
+        components.union(src, dst)
+    return components.components, {node: components.find(node) for node in nodes}
 
 def largest_component_size(id: dict):
     '''
@@ -106,7 +107,50 @@ def largest_component_size(id: dict):
     
     return max(sizes.values())
 
-def compare_cc(filename: str, attack_set_subtree: list, attack_set_centrality: list):
+def robustness_curve(filename: str, attack_set: list):
+    '''
+    function that compute the number of cc and the size of the largest cc after removing the nodes of the attack set one at a time
+
+    input:
+        - filename: str, the name of the file containing the information about the network
+        - attack_set: list, nodes in the order of removal
+
+    output:
+        - list of (number of cc, size of the largest cc) after removing the first i nodes, for i from 0 to len(attack_set)
+    '''
+    nodes, u, v = static_graph(filename)
+    num_nodes = nodes[-1] + 1 if nodes else 0
+
+    # an edge is in the graph until one of its endpoints is removed: the step at which it is removed is the rank
+    # of its first removed endpoint (len(attack_set) + 1 if no endpoint is removed)
+    rank = np.full(num_nodes, len(attack_set) + 1, dtype=np.int64)
+    for step in range(len(attack_set), 0, -1):
+        if 0 <= attack_set[step - 1] < num_nodes:
+            rank[attack_set[step - 1]] = step
+    removed_at = np.minimum(rank[u], rank[v])
+    order = np.argsort(-removed_at, kind='stable')
+    u, v, removed_at = u[order].tolist(), v[order].tolist(), removed_at[order].tolist()
+
+    # the graph without all the attack set, then the nodes are added back from the last removed one
+    components = UnionFind(nodes, num_nodes)
+    curve = []
+    position = 0
+    for step in range(len(attack_set), -1, -1):
+        while position < len(u) and removed_at[position] > step:
+            components.union(u[position], v[position])
+            position += 1
+        curve.append((components.components, components.largest))
+    return curve[::-1]
+
+def print_robustness_curve(filename: str, attack_set: list, name: str):
+    '''
+    function that print the robustness curve of an attack set
+    '''
+    print(f'robustness curve of the {name} algorithm (removed nodes, number of cc, size of the largest cc):')
+    for removed, (counter, largest) in enumerate(robustness_curve(filename, attack_set)):
+        print(removed, counter, largest)
+
+def compare_cc(filename: str, attack_set_subtree: list, attack_set_centrality: list, curve: bool = False):
     '''
     function that print the number of connected components with the full graph, without the attack set from subtree algorithm and without the attack set from centrality algorithm
     
@@ -114,6 +158,7 @@ def compare_cc(filename: str, attack_set_subtree: list, attack_set_centrality: l
         - filename: str, the name of the file containing the information about the network
         - attack_set_subtree: list, list of nodes selected by the subtree algorithm
         - attack_set_centrality: list, list of nodes selected by the centrality algorithm
+        - curve: bool, if True the robustness curves of the two attack sets are printed too
         
     output: None
     '''
@@ -141,10 +186,16 @@ def compare_cc(filename: str, attack_set_subtree: list, attack_set_centrality: l
     print('size largest cc after removing in subtree: ', largest_subtree)
     print('size largest cc after removing in centrality: ', largest_centrality)
 
+    if curve:
+        print()
+        print_robustness_curve(filename, list(attack_set_subtree), 'subtree')
+        print()
+        print_robustness_curve(filename, list(attack_set_centrality), 'centrality')
+
 if __name__ == '__main__':
     filename = 'data/email.txt'
     
     attack_set_subtree = [43, 88, 54, 25, 66, 80, 23, 48, 16, 35]
     attack_set_centrality = [54, 60, 71, 49, 25, 24, 48, 0, 26, 35]
     
-    compare_cc(filename, attack_set_subtree, attack_set_centrality)
\ No newline at end of file
+    compare_cc(filename, attack_set_subtree, attack_set_centrality, curve=True)
@@ -0,0 +1,167 @@
+'''
+file that define the lazy greedy (CELF) selection of the seed set and of the attack set, based on the simulated spread of the infection
+
+the spread of a seed set is estimated on a fixed sample of successful messages (the same random numbers for every
+seed set), so on that sample it is a monotone and submodular function: the gain of a candidate can only decrease
+when the seed set grows, and the candidates whose old gain is lower than the best fresh gain don't need to be evaluated again.
+the reduction of the spread given by an attack set is not always submodular (removing two nodes can block a path that
+neither of them blocks alone), so for the attack sets the lazy greedy is a heuristic: a stale gain is trusted when it
+is still the best one
+'''
+
+import heapq
+
+import numpy as np
+
+from loader import load_dataset
+from infectionKernel import NOT_INFECTED, MessageIndex, infected_counts, sample_messages
+from monteCarlo import root_seed_sequence
+from reachability import ReachabilityIndex
+
+PROB_OF_BEING_INFECTED = 0.2
+
+# number of simulations used to estimate the spread
+REPLICATES = 100
+
+# ------------------------- class SpreadOracle -------------------------
+
+class SpreadOracle:
+
+    def __init__(self, filename: str, prob: float = PROB_OF_BEING_INFECTED, replicates: int = REPLICATES, seed=None):
+        '''
+        init function of the class SpreadOracle
+        the successful messages of the replicates are drawn once, every estimate uses the same ones
+        '''
+        self.dataset = load_dataset(filename)
+        rng = np.random.default_rng(root_seed_sequence(seed))
+        replicate, edge = sample_messages(self.dataset, prob, replicates, rng)
+        self.messages = MessageIndex(self.dataset, replicates, replicate, edge)
+
+        # number of estimates computed, to check how many evaluations the lazy greedy saves
+        self.evaluations = 0
+
+    def spread(self, seed_set, removed_nodes=()) -> float:
+        '''
+        function that return the mean number of infected nodes when the infection starts from seed_set and the
+        removed_nodes are removed from the graph
+        '''
+        self.evaluations += 1
+        infected_at = self.messages.infection_batches(seed_set, self.dataset.keep_mask(removed_nodes))
+        return float(infected_counts(infected_at).mean())
+
+# ------------------------- lazy greedy -------------------------
+
+def lazy_greedy(candidates, objective, budget: int, upper_bounds=None):
+    '''
+    function that select budget candidates with the lazy greedy algorithm (CELF)
+    input: candidates is the list of candidates, objective is a monotone submodular function that return the value
+    of a list of selected candidates, budget is the number of candidates to select, upper_bounds are optional upper
+    bounds of the gain of each candidate alone: if they are passed, the first gains are computed only when needed
+    output: the list of the selected candidates, in the order of selection, and their value
+    '''
+    selected = []
+    value = objective(selected)
+
+    # each entry is (-gain, position of the candidate, candidate, number of selected candidates when the gain was computed),
+    # the ties are won by the first candidate of the list. an upper bound is never up to date, so it is computed at -1
+    if upper_bounds is None:
+        heap = [(-(objective([candidate]) - value), position, candidate, 0) for position, candidate in enumerate(candidates)]
+    else:
+        heap = [(-bound, position, candidate, -1) for position, (candidate, bound) in enumerate(zip(candidates, upper_bounds))]
+    heapq.heapify(heap)
+
+    while heap and len(selected) < budget:
+        negative_gain, position, candidate, computed = heapq.heappop(heap)
+        if computed == len(selected):
+            # the gain is up to date, so it is the best one
+            selected.append(candidate)
+            value -= negative_gain
+        else:
+            gain = objective(selected + [candidate]) - value
+            heapq.heappush(heap, (-gain, position, candidate, len(selected)))
+
+    return selected, value
+
+def celf_seed_set(filename: str, budget: int, prob: float = PROB_OF_BEING_INFECTED, replicates: int = REPLICATES, candidates=None, seed=None) -> list[int]:
+    '''
+    function that choose the seed set that maximize the simulated spread of the infection
+    input: filename is the name of the file containing the graph, budget is the number of seeds, prob is the probability of
+    being infected by a message, replicates is the number of simulations of the estimates, candidates are the nodes that
+    can be chosen (by default all the nodes that send at least one message), seed is the root seed of the simulations
+    output: the seed set, in the order of selection
+    '''
+    oracle = SpreadOracle(filename, prob, replicates, seed)
+    if candidates is None:
+        out_degrees, _ = oracle.dataset.degrees()
+        candidates = np.flatnonzero(out_degrees).tolist()
+
+    # a node can't infect more nodes than the ones that it reaches with time-respecting paths, so the candidates
+    # with a low bound are never simulated
+    bounds = ReachabilityIndex(filename).counts(candidates).tolist()
+    seed_set, spread = lazy_greedy(candidates, oracle.spread, budget, bounds)
+    print(f"Spread of the seed set: {spread} ({oracle.evaluations} estimates for {len(candidates)} candidates)")
+    return seed_set
+
+def subtree_bounds(messages: MessageIndex, infected_at):
+    '''
+    function that return, for each node, the mean size of its subtree in an infection tree of each simulation
+    (each infected node is attached to one of the nodes that have sent it a successful message before its infection).
+    the nodes out of the subtree of a removed node keep the path from their seed, so the mean size is an upper bound of
+    the reduction of the spread given by removing the node
+    '''
+    # the seeds that don't appear in the dataset don't send messages
+    num_nodes = messages.dataset.num_nodes
+    replicates = len(infected_at)
+    flat = np.ascontiguousarray(infected_at[:, :num_nodes]).reshape(-1)
+    sender = np.repeat(np.arange(len(messages.offsets) - 1), np.diff(messages.offsets))
+
+    # messages that infect their dst in the batch of its infection, only the first one is an edge of the tree
+    infecting = (messages.batch == flat[messages.dst]) & (flat[sender] < messages.batch)
+    child, first = np.unique(messages.dst[infecting], return_index=True)
+    parent = sender[infecting][first]
+
+    # the parent is infected before the child, so the sizes are accumulated from the last infected nodes
+    order = np.argsort(flat[child], kind='stable')[::-1]
+    sizes = (flat != NOT_INFECTED).astype(np.int64).tolist()
+    for node, father in zip(child[order].tolist(), parent[order].tolist()):
+        sizes[father] += sizes[node]
+    return np.asarray(sizes, dtype=np.int64).reshape(replicates, num_nodes).mean(axis=0)
+
+def celf_attack_set(filename: str, seed_set: set, budget: int, prob: float = PROB_OF_BEING_INFECTED, replicates: int = REPLICATES, candidates=None, seed=None) -> list[int]:
+    '''
+    function that choose the nodes to remove that reduce the most the simulated spread of the infection
+    input: filename is the name of the file containing the graph, seed_set is the set of original infected nodes, budget is
+    the number of nodes to remove, prob is the probability of being infected by a message, replicates is the number of
+    simulations of the estimates, candidates are the nodes that can be removed (by default the nodes that are infected
+    in at least one simulation), seed is the root seed of the simulations
+    output: the attack set, in the order of selection
+    '''
+    oracle = SpreadOracle(filename, prob, replicates, seed)
+    seed_set = set(seed_set)
+    infected_at = oracle.messages.infection_batches(seed_set)
+    if candidates is None:
+        # removing a node that is never infected doesn't change the infection
+        infected = np.flatnonzero((infected_at != NOT_INFECTED).any(axis=0)).tolist()
+        candidates = [node for node in infected if node not in seed_set]
+
+    baseline = float(infected_counts(infected_at).mean())
+    def reduction(removed_nodes):
+        return baseline - oracle.spread(seed_set, removed_nodes)
+
+    bounds = subtree_bounds(oracle.messages, infected_at)
+    attack_set, saved = lazy_greedy(candidates, reduction, budget, [bounds[node] if node < len(bounds) else 0.0 for node in candidates])
+    print(f"Reduction of the spread: {saved} of {baseline} ({oracle.evaluations} estimates for {len(candidates)} candidates)")
+    return attack_set
+
+# ------------------------- Main -------------------------
+
+if __name__ == "__main__":
+
+    filename = "data/email.txt"
+    node_budget = 4
+
+    seed_set = celf_seed_set(filename, node_budget)
+    print(f"Seed set: {seed_set}")
+
+    attack_set = celf_attack_set(filename, set(seed_set), node_budget)
+    print(f"Attack set: {attack_set}")
@@ -10,6 +10,7 @@
 # ------------------------- Main -------------------------
 
 from matplotlib import pyplot as plt
+from loader import load_dataset
 
 def degree_nodes (filename: str, attack_set_subtree: list, attack_set_centrality: list):
     '''
@@ -23,54 +24,34 @@ def degree_nodes (filename: str, attack_set_subtree: list, attack_set_centrality
         
     output: None
     '''
-    degrees_in = []
-    degrees_out = []
-    
     # find common nodes
     common_nodes = set(attack_set_subtree).intersection(set(attack_set_centrality))
     print(f"Common nodes: {common_nodes}")
     print(f"Number of common nodes: {len(common_nodes)}")
 
 
-    # read the file
-    with open(filename, 'r') as f:
-        split_char = ' '
-        if filename == 'data/fb-forum.txt':
-            split_char = ','
-        for line in f:
-            src, dst, unixts = line.split(split_char)
-            src, dst, unixts = int(src), int(dst), int(unixts)
-
-            # if the src is not in the list, add 1 in the list in position src
-            if len(degrees_in) <= src:
-                for _ in range(src - len(degrees_in) + 1):
-                    degrees_in.append(0)
-            degrees_in[src] += 1
-
-            # if the dst is not in the list, add 1 in the list in position dst
-            if len(degrees_out) <= dst:
-                for _ in range(dst - len(degrees_out) + 1):
-                    degrees_out.append(0)
-            degrees_out[dst] += 1
+    # number of edges sent and received by each node, from the incident-edge index of the dataset
+    dataset = load_dataset(filename)
+    degrees_out, degrees_in = (degrees.tolist() for degrees in dataset.degrees())
 
     # plot the degrees of nodes selected by subtree attack and centrality attack
     set_plot_subtree = list()
     set_plot_centrality = list()
     _, ax = plt.subplots(figsize=(10, 5))
 
-    subtree_count = 0
     # histogram of degrees of nodes selected by subtree attack
     for node in attack_set_subtree:
         total_nodes = degrees_in[node] + degrees_out[node]
         set_plot_subtree.append(total_nodes)
-        subtree_count += total_nodes
 
-    centrality_count = 0
     # histogram of degrees of nodes selected by centrality attack
     for node in attack_set_centrality:
         total_nodes = degrees_in[node] + degrees_out[node]
         set_plot_centrality.append(total_nodes)
-        centrality_count += total_nodes
+
+    # the edges between two removed nodes are counted once
+    subtree_count = dataset.removed_interactions(attack_set_subtree)
+    centrality_count = dataset.removed_interactions(attack_set_centrality)
     
     plt.hist([set_plot_centrality, set_plot_subtree], bins=100, alpha=0.5)
     plt.legend(['Centrality', 'Subtree'], loc='upper right', fontsize=15)
@@ -0,0 +1,106 @@
+'''
+file that define the dominator tree of a directed graph, computed with the Lengauer-Tarjan algorithm
+
+a node u dominates a node v if every path from the root to v passes through u, so removing u disconnects from the root
+all the nodes that it dominates. the graph is given as the list of the successors of each node (the nodes are the
+integers from 0 to len(successors) - 1). the depth-first search and the path compression are iterative, so deep graphs
+don't hit the recursion limit
+'''
+
+# dominator of the root and of the nodes that can't be reached from the root
+NO_DOMINATOR = -1
+
+def depth_first_search(successors: list[list[int]], root: int):
+    '''
+    function that visit the graph in depth-first order from the root
+    output: the list of the visited nodes in preorder, the preorder number of each node (-1 if it is not reached)
+    and the parent of each node in the depth-first tree
+    '''
+    number = [-1] * len(successors)
+    parent = [NO_DOMINATOR] * len(successors)
+    order = []
+
+    # a node is visited when it is popped, its parent is the last visited node that has pushed it
+    stack = [(root, NO_DOMINATOR)]
+    while stack:
+        node, father = stack.pop()
+        if number[node] != -1:
+            continue
+        number[node] = len(order)
+        order.append(node)
+        parent[node] = father
+        stack.extend((child, node) for child in reversed(successors[node]) if number[child] == -1)
+    return order, number, parent
+
+def immediate_dominators(successors: list[list[int]], root: int = 0) -> list[int]:
+    '''
+    function that compute the immediate dominator of each node
+    output: the list with the immediate dominator of each node (NO_DOMINATOR for the root and the nodes not reached)
+    '''
+    order, number, parent = depth_first_search(successors, root)
+
+    predecessors = [[] for _ in successors]
+    for node in order:
+        for child in successors[node]:
+            predecessors[child].append(node)
+
+    # semi is the preorder number of the semidominator, ancestor and label are the forest used by eval
+    semi = number[:]
+    label = list(range(len(successors)))
+    ancestor = [NO_DOMINATOR] * len(successors)
+    dominator = [NO_DOMINATOR] * len(successors)
+    bucket = [[] for _ in successors]
+
+    def evaluate(node):
+        '''
+        function that return the node with the lowest semidominator on the path from node to the root of its tree
+        in the forest, compressing the path
+        '''
+        if ancestor[node] == NO_DOMINATOR:
+            return node
+        path = []
+        current = node
+        while ancestor[ancestor[current]] != NO_DOMINATOR:
+            path.append(current)
+            current = ancestor[current]
+        for current in reversed(path):
+            if semi[label[ancestor[current]]] < semi[label[current]]:
+                label[current] = label[ancestor[current]]
+            ancestor[current] = ancestor[ancestor[current]]
+        return label[node]
+
+    for node in reversed(order[1:]):
+        for predecessor in predecessors[node]:
+            candidate = evaluate(predecessor)
+            if semi[candidate] < semi[node]:
+                semi[node] = semi[candidate]
+        bucket[order[semi[node]]].append(node)
+
+        father = parent[node]
+        ancestor[node] = father
+        for child in bucket[father]:
+            candidate = evaluate(child)
+            dominator[child] = candidate if semi[candidate] < semi[child] else father
+        bucket[father].clear()
+
+    for node in order[1:]:
+        if dominator[node] != order[semi[node]]:
+            dominator[node] = dominator[dominator[node]]
+    return dominator
+
+def dominated_counts(successors: list[list[int]], root: int = 0) -> list[int]:
+    '''
+    function that count the nodes dominated by each node (itself included), that is the number of nodes that are
+    disconnected from the root when it is removed
+    output: the list with the count of each node (0 for the nodes that can't be reached from the root)
+    '''
+    dominator = immediate_dominators(successors, root)
+    order, _, _ = depth_first_search(successors, root)
+
+    # the immediate dominator of a node comes before it in preorder, so the counts are accumulated backwards
+    counts = [0] * len(successors)
+    for node in reversed(order):
+        counts[node] += 1
+        if dominator[node] != NO_DOMINATOR:
+            counts[dominator[node]] += counts[node]
+    return counts
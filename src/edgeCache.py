@@ -0,0 +1,150 @@
+'''
+file that define the binary cache of the temporal edge lists contained in data/
+
+the first time a file is loaded, its edges are parsed and stored as three columnar .npy arrays (src, dst, unixts)
+in a .edgecache directory next to the file; the following loads memory-map those arrays instead of parsing the text again
+'''
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_DIR = '.edgecache'
+CACHE_VERSION = 1
+COLUMNS = ('src', 'dst', 'unixts')
+
+# ------------------------- cache paths -------------------------
+
+def cache_paths(filename: str):
+    '''
+    function that return the paths of the cache files of a dataset
+    input: filename is the name of the file containing the graph
+    output: the path of the metadata file and a dictionary with the path of each column
+    '''
+    directory = os.path.join(os.path.dirname(filename), CACHE_DIR)
+    name = os.path.basename(filename)
+    meta_path = os.path.join(directory, f"{name}.json")
+    column_paths = {column: os.path.join(directory, f"{name}.{column}.npy") for column in COLUMNS}
+    return meta_path, column_paths
+
+# ------------------------- validation -------------------------
+
+def file_digest(filename: str) -> str:
+    '''
+    function that compute the sha1 of the content of a file
+    '''
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_metadata(meta_path: str):
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_metadata(meta_path: str, meta: dict):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+def is_cache_valid(filename: str, meta, options: dict) -> bool:
+    '''
+    function that check if the cache still describe the source file
+    the size and the mtime are checked first, the sha1 is computed only if the mtime has changed
+    (e.g. after a checkout) and, if the content is the same, the stored mtime is refreshed
+    input: filename is the name of the file containing the graph, meta is the stored metadata, options are the parsing options
+    output: True if the cache can be used
+    '''
+    if meta is None or meta.get('version') != CACHE_VERSION or meta.get('options') != options:
+        return False
+
+    stat = os.stat(filename)
+    if meta['size'] != stat.st_size:
+        return False
+    if meta['mtime_ns'] == stat.st_mtime_ns:
+        return True
+
+    if meta['sha1'] != file_digest(filename):
+        return False
+    meta['mtime_ns'] = stat.st_mtime_ns
+    try:
+        write_metadata(cache_paths(filename)[0], meta)
+    except OSError:
+        pass
+    return True
+
+# ------------------------- parsing -------------------------
+
+def parse_edge_file(filename: str, delimiter=' ', header: bool = False, columns=(0, 1, 2)):
+    '''
+    function that parse a temporal edge list
+    data format -> src dst unixts
+    input: filename is the name of the file containing the graph, delimiter is the character between the columns
+    (None for any whitespace), header says if the first line has to be skipped, columns are the positions of src, dst and unixts
+    output: the arrays of src, dst and unixts
+    '''
+    with open(filename, 'r') as f:
+        edges = np.loadtxt(f, delimiter=delimiter, skiprows=int(header), usecols=tuple(columns), dtype=np.int64, ndmin=2)
+    if edges.size == 0:
+        edges = np.empty((0, len(COLUMNS)), dtype=np.int64)
+
+    src, dst, unixts = edges[:, 0], edges[:, 1], edges[:, 2]
+
+    # node ids are stored on 32 bits whenever possible to halve the size of the cache
+    id_type = np.int32 if edges.shape[0] == 0 or max(src.max(), dst.max()) < np.iinfo(np.int32).max else np.int64
+    return np.ascontiguousarray(src, dtype=id_type), np.ascontiguousarray(dst, dtype=id_type), np.ascontiguousarray(unixts)
+
+def build_edge_cache(filename: str, options: dict):
+    '''
+    function that parse the file and write its columns in the cache
+    input: filename is the name of the file containing the graph, options are the parsing options
+    output: the parsed arrays of src, dst and unixts
+    '''
+    columns = parse_edge_file(filename, **options)
+
+    meta_path, column_paths = cache_paths(filename)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    for column, values in zip(COLUMNS, columns):
+        tmp_path = column_paths[column] + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, column_paths[column])
+
+    # the metadata is written last, so an interrupted build is never considered valid
+    stat = os.stat(filename)
+    write_metadata(meta_path, {
+        'version': CACHE_VERSION,
+        'options': options,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': file_digest(filename),
+        'edges': len(columns[0]),
+    })
+    return columns
+
+def load_edge_arrays(filename: str, delimiter=' ', header: bool = False, columns=(0, 1, 2)):
+    '''
+    function that load the edges of a temporal graph, using the binary cache when it is valid
+    input: filename is the name of the file containing the graph, the other parameters are the parsing options of parse_edge_file
+    output: the read-only arrays of src, dst and unixts
+    '''
+    options = {'delimiter': delimiter, 'header': header, 'columns': list(columns)}
+    meta_path, column_paths = cache_paths(filename)
+
+    if not is_cache_valid(filename, read_metadata(meta_path), options):
+        try:
+            build_edge_cache(filename, options)
+        except OSError:
+            # read-only dataset directory: just use the parsed arrays
+            return parse_edge_file(filename, **options)
+
+    # an empty array can't be memory-mapped
+    mmap_mode = 'r' if read_metadata(meta_path)['edges'] > 0 else None
+    return tuple(np.load(column_paths[column], mmap_mode=mmap_mode) for column in COLUMNS)
@@ -0,0 +1,284 @@
+'''
+file that define the forest of the infection used by the subtree algorithm
+
+the forest is stored in parallel arrays (id, infection time, parent, first child, last child and next sibling of each
+node of the trees) and it keeps an index from the id of each infected node to its position, so a new infected node is
+attached to its infector in constant time. all the traversals are iterative, so deep trees don't hit the recursion limit.
+the Node objects are still available through Forest.to_nodes, e.g. for print_tree
+'''
+
+from array import array
+import heapq
+import random
+from collections import defaultdict
+from operator import itemgetter
+from loader import load_dataset
+from monteCarlo import python_random
+
+# position of a missing parent, child or sibling
+NO_NODE = -1
+
+# ------------------------- class Node -------------------------
+
+class Node:
+
+    def __init__(self, id, timestamp):
+        ''''
+        init function of the class Node
+        '''
+        self.id = id
+        self.timestamp = timestamp
+        self.children = []
+        self.subtree_size = 0
+
+    def add_child(self, child):
+        '''
+        add a child to the node
+        '''
+        self.children.append(child)
+
+    def __repr__(self):
+        return f"{self.id}, {self.timestamp}"
+
+# ------------------------- class Forest -------------------------
+
+class Forest:
+
+    def __init__(self, seed_set=()):
+        '''
+        init function of the class Forest
+        every seed is the root of a tree, the nodes are identified by their position in the arrays
+        '''
+        self.ids = array('q')
+        self.timestamps = array('q')
+        self.parents = array('q')
+        self.first_child = array('q')
+        self.last_child = array('q')
+        self.next_sibling = array('q')
+
+        # positions of the roots and index of the infected nodes (id -> position)
+        self.roots = []
+        self.index = {}
+
+        for seed in seed_set:
+            self.add_node(seed, -1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add_node(self, id: int, timestamp: int, parent: int = NO_NODE) -> int:
+        '''
+        function that add a node to the forest as last child of parent (or as a new root)
+        output: the position of the new node
+        '''
+        position = len(self.ids)
+        self.ids.append(id)
+        self.timestamps.append(timestamp)
+        self.parents.append(parent)
+        self.first_child.append(NO_NODE)
+        self.last_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+
+        if parent == NO_NODE:
+            self.roots.append(position)
+        else:
+            if self.first_child[parent] == NO_NODE:
+                self.first_child[parent] = position
+            else:
+                self.next_sibling[self.last_child[parent]] = position
+            self.last_child[parent] = position
+
+        self.index[id] = position
+        return position
+
+    def children(self, position: int) -> list[int]:
+        '''
+        function that return the positions of the children of a node, in the order in which they have been added
+        '''
+        children = []
+        child = self.first_child[position]
+        while child != NO_NODE:
+            children.append(child)
+            child = self.next_sibling[child]
+        return children
+
+    def preorder(self) -> list[int]:
+        '''
+        function that return the positions of the nodes in depth-first order, tree by tree
+        '''
+        order = []
+        stack = list(reversed(self.roots))
+        while stack:
+            position = stack.pop()
+            order.append(position)
+            stack.extend(reversed(self.children(position)))
+        return order
+
+    def subtree_sizes(self) -> list[int]:
+        '''
+        function that return the size of the subtree of each node, that is the number of leaves under it
+        a child is always added after its parent, so the sizes are accumulated visiting the positions backwards
+        '''
+        sizes = [0] * len(self.ids)
+        parents = self.parents
+        first_child = self.first_child
+        for position in range(len(sizes) - 1, -1, -1):
+            if first_child[position] == NO_NODE:
+                sizes[position] = 1
+            if parents[position] != NO_NODE:
+                sizes[parents[position]] += sizes[position]
+        return sizes
+
+    def to_nodes(self) -> list[Node]:
+        '''
+        function that convert the forest in trees of Node objects, with their subtree sizes
+        output: the list of the roots
+        '''
+        sizes = self.subtree_sizes()
+        nodes = [Node(id, timestamp) for id, timestamp in zip(self.ids, self.timestamps)]
+        for position, node in enumerate(nodes):
+            node.subtree_size = sizes[position]
+            if self.parents[position] != NO_NODE:
+                nodes[self.parents[position]].add_child(node)
+        return [nodes[root] for root in self.roots]
+
+    @classmethod
+    def from_nodes(cls, trees: list[Node]):
+        '''
+        function that build a Forest from trees of Node objects
+        '''
+        forest = cls()
+        stack = [(tree, NO_NODE) for tree in reversed(trees)]
+        while stack:
+            tree, parent = stack.pop()
+            position = forest.add_node(tree.id, tree.timestamp, parent)
+            stack.extend((child, position) for child in reversed(tree.children))
+        return forest
+
+    def __repr__(self):
+        return f"forest with {len(self.roots)} trees and {len(self)} nodes"
+
+# ------------------------ print tree ------------------------
+
+def print_tree(tree, spaces=0):
+    ''''
+    function that print the tree as an horizontal tree
+    if spaces are passed in input, the tree will be printed with the number of spaces passed in input
+    a Forest is printed tree by tree
+    '''
+    stack = [(tree, spaces) for tree in reversed(tree.to_nodes())] if isinstance(tree, Forest) else [(tree, spaces)]
+    while stack:
+        node, spaces = stack.pop()
+        print(" " * spaces, node)
+        stack.extend((child, spaces+1) for child in reversed(node.children))
+
+# ------------------------- forward forest -------------------------
+
+def forward_forest (seed_set : set, filename : str, prob: float, rng=random) -> Forest:
+    '''
+    Simulation of the infection to find the forest of the infection
+    input: seed_set is the set of original infected nodes, filename is the name of the file containing the graph
+    rng is the generator used for the infections (the random module, or a random.Random instance)
+    output: the forest of the infection
+    '''
+
+    # final forest of the infection, its index contains the infected nodes
+    forest = Forest(seed_set)
+
+    # the messages sent to the seeds are ignored by update_infection_tree, since the seeds are already infected
+    dataset = load_dataset(filename)
+    src_ids, dst_ids, timestamps = dataset.columns()
+
+    for start, end in dataset.batches():
+        update_infection_tree (src_ids[start:end], dst_ids[start:end], forest, timestamps[start], prob, rng)
+
+    return forest
+
+def update_infection_tree (src_ids : list[int], dst_ids : list[int], forest : Forest, unixts : int, prob: float, rng=random):
+    '''
+    function that process a batch of messages: for each node that is not infected, it choose the first infected message
+    received in the batch and, with probability prob, the node is added to the infection tree as child of the src of the message
+    input: src_ids and dst_ids are the senders and the receivers of the messages of the batch, forest is the forest of
+    the infection, unixts is the timestamp of the batch
+    output: it doesn't return anything, it just update the forest of the infection
+    '''
+    infected = forest.index
+
+    # if no src is infected, no message of the batch is infected
+    if infected.keys().isdisjoint(src_ids):
+        return
+
+    # first infected src that has sent a message to each dst (None if all the messages are not infected)
+    first_infected_src = dict.fromkeys(dst_ids)
+    for src, dst in zip(src_ids, dst_ids):
+        if first_infected_src[dst] is None and src in infected:
+            first_infected_src[dst] = src
+
+    for dst, src in first_infected_src.items():
+        if src is not None and dst not in infected:
+            infection_result = rng.uniform(0, 1)
+            if infection_result <= prob:
+                add_infected_edges (forest, dst, unixts, src)
+
+def add_infected_edges (forest : Forest, dst : int, unixts : int, src: int):
+    ''''
+    function that add a new infected edge between the node of the src and the new infected node
+    input: forest is the forest of the infection, dst is the node that has been infected at unixts, src is the id of the infector
+    output: it doesn't return anything, it just update the forest of the infection
+    '''
+    father = forest.index[src]
+    if forest.timestamps[father] < unixts:
+        forest.add_node(dst, unixts, father)
+
+# ------------------------- choose nodes -------------------------
+
+def choose_nodes (forest: Forest, seed_set: set[int], budget: int) -> set[int]:
+    '''
+    function that choose k nodes from the forest
+    input: forest is the forest of the infection (or the list of its Node trees), seed_set is the set of initial infected nodes,
+    k is the number of nodes to choose
+    output: the set of nodes chosen (less than k if the forest doesn't have enough nodes that are not seeds)
+    '''
+    if not isinstance(forest, Forest):
+        forest = Forest.from_nodes(forest)
+
+    # count the size of the subtree of each node
+    subtree_size = forest.subtree_sizes()
+    ids = forest.ids
+
+    # each eligible id is ranked by its largest subtree, the ties are broken by the depth-first order of the forest
+    # (an id that appears more than once keeps its best rank)
+    ranks = {}
+    for order, position in enumerate(forest.preorder()):
+        id = ids[position]
+        if id in seed_set:
+            continue
+        rank = (-subtree_size[position], order)
+        if id not in ranks or rank < ranks[id]:
+            ranks[id] = rank
+
+    # choose k nodes from the nodes with the highest subtree size
+    return set(id for id, _ in heapq.nsmallest(budget, ranks.items(), key=itemgetter(1)))
+
+def find_best_node (nodes : dict[int, int], budget : int) -> list[int]:
+
+    # sort the nodes by their subtree size
+    sorted_nodes = {k: v for k, v in sorted(nodes.items(), key=itemgetter(1), reverse=True)}
+    return list(sorted_nodes.keys())[:budget]
+
+# ------------------------- Monte Carlo task -------------------------
+
+def subtree_votes (filename: str, seed_set: set, node_budget: int, prob: float, replicates: int, seed_sequence) -> dict[int, int]:
+    '''
+    task of the Monte Carlo runner: it samples replicates forests of the infection and count how many times
+    each node is chosen by choose_nodes
+    '''
+    rng = python_random(seed_sequence)
+    removed_nodes = defaultdict(int)
+    for _ in range (replicates):
+        forest = forward_forest (seed_set, filename, prob, rng)
+
+        selected_node = choose_nodes (forest, seed_set, node_budget)
+        for node in selected_node:
+            removed_nodes[node] = removed_nodes[node] + 1
+    return dict(removed_nodes)
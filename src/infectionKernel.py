@@ -0,0 +1,277 @@
+'''
+file that define the vectorized kernel of the infection used by simulate_infection
+
+a node that receives k infected messages in a batch is infected with probability 1 - (1 - prob)^k, that is the probability
+that at least one of k messages, each one transmitting the infection with probability prob, is successful.
+so all the uniforms of a simulation are drawn at once (one for each message) and the infection spreads only along the
+successful messages: the batch in which a node is infected is the first batch in which it receives a successful message
+from a node infected in a previous batch, and it is found by relaxing all the successful messages together with numpy.
+
+removing nodes can't change what happens before the first batch with an edge of a removed node, so an attack set can be
+evaluated from a checkpoint of the run without removed nodes: the state of the infection at the start of any batch is
+given by the infection batches of that run, and its successful messages play the role of the random state (common random
+numbers), so only the messages from the first affected batch on are relaxed again
+'''
+
+import random
+from typing import NamedTuple
+
+import numpy as np
+
+# infection batch of the nodes that are never infected
+NOT_INFECTED = np.iinfo(np.int64).max
+
+# maximum number of uniforms drawn at once by replicate_infection_batches
+MAX_DRAWS = 1 << 22
+
+class Checkpoint(NamedTuple):
+    '''
+    run of the infection without removed nodes: replicates x num_nodes matrix of the infection batches and the
+    replicate and the position of each successful message, sorted by replicate and position
+    '''
+    infected_at: np.ndarray
+    replicate: np.ndarray
+    edge: np.ndarray
+
+# ------------------------- random numbers -------------------------
+
+def make_rng(rng=None) -> np.random.Generator:
+    '''
+    function that return the numpy generator used by the kernel
+    if no generator is passed, a new one is seeded from the random module, so random.seed keeps the simulations reproducible
+    '''
+    if rng is None:
+        return np.random.default_rng(random.getrandbits(64))
+    return rng
+
+# ------------------------- kernel -------------------------
+
+def relax_messages(infected_at, src, dst, batch):
+    '''
+    function that spread the infection along the successful messages
+    input: infected_at is the array with the infection batch of each node, src, dst and batch are the arrays of the successful messages
+    output: it doesn't return anything, it just update infected_at
+    '''
+    while len(src) > 0:
+        # a successful message infects its dst if the src has been infected in a previous batch
+        active = infected_at[src] < batch
+        if not active.any():
+            break
+        np.minimum.at(infected_at, dst[active], batch[active])
+
+        # the active messages have been applied and can't infect earlier, the ones sent to nodes
+        # already infected before them are useless: only the others have to be checked again
+        pending = ~active
+        pending[pending] = infected_at[dst[pending]] > batch[pending]
+        src, dst, batch = src[pending], dst[pending], batch[pending]
+
+def initial_state(dataset, seed_set, replicates: int):
+    '''
+    function that return the replicates x num_nodes matrix in which only the seeds are infected
+    '''
+    seeds = np.fromiter(seed_set, dtype=np.int64, count=len(seed_set))
+    num_nodes = max(dataset.num_nodes, int(seeds.max()) + 1 if len(seeds) > 0 else 0)
+    infected_at = np.full((replicates, num_nodes), NOT_INFECTED, dtype=np.int64)
+    infected_at[:, seeds] = -1
+    return infected_at
+
+def successful_messages(dataset, prob: float, replicates: int, rng, keep=None):
+    '''
+    generator that draw the uniforms of the messages, in chunks of replicates that fit in memory
+    output: for each chunk, the first and the last replicate and the replicate and the position of its successful messages
+    '''
+    chunk = max(1, MAX_DRAWS // max(1, len(dataset)))
+    for first in range(0, replicates, chunk):
+        last = min(replicates, first + chunk)
+
+        # a message is successful if its uniform is lower than prob
+        successful = rng.random((last - first, len(dataset))) < prob
+        if keep is not None:
+            successful &= keep
+        replicate, edge = np.nonzero(successful)
+        yield first, last, replicate, edge
+
+def relax_replicates(dataset, infected_at, first: int, last: int, replicate, edge):
+    '''
+    function that relax the successful messages of the replicates from first to last
+    each successful message of each replicate is identified by replicate * num_nodes + node, so all the replicates
+    are relaxed in the same passes over the edges
+    '''
+    num_nodes = infected_at.shape[1]
+    offset = replicate * num_nodes
+
+    # the rows of the chunk are contiguous, so the flat array is a view on infected_at
+    chunk_infected_at = infected_at[first:last].reshape(-1)
+    relax_messages(chunk_infected_at, offset + dataset.src[edge], offset + dataset.dst[edge], dataset.batch_ids()[edge])
+
+def replicate_infection_batches(dataset, seed_set, prob: float, replicates: int, rng=None, keep=None):
+    '''
+    function that simulate many independent replicates of the infection together
+    input: dataset is the TemporalDataset of the graph, seed_set is the set of original infected nodes, prob is the
+    probability of being infected by a message, replicates is the number of simulations, rng is the numpy generator,
+    keep is the boolean array of the edges that are not removed (None if all the edges are kept)
+    output: replicates x num_nodes matrix with the batch in which each node has been infected in each replicate
+    (-1 for the seeds, NOT_INFECTED for the nodes never infected)
+    '''
+    infected_at = initial_state(dataset, seed_set, replicates)
+    for first, last, replicate, edge in successful_messages(dataset, prob, replicates, make_rng(rng), keep):
+        relax_replicates(dataset, infected_at, first, last, replicate, edge)
+    return infected_at
+
+def sample_messages(dataset, prob: float, replicates: int, rng=None):
+    '''
+    function that draw the successful messages of replicates simulations, they don't depend on the seeds and on the
+    removed nodes, so the same messages can be used to evaluate many seed sets (common random numbers)
+    output: the replicate and the position of each successful message, sorted by replicate and position
+    '''
+    replicates_list, edges_list = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for first, _, replicate, edge in successful_messages(dataset, prob, replicates, make_rng(rng)):
+        replicates_list.append(replicate + first)
+        edges_list.append(edge)
+    return np.concatenate(replicates_list), np.concatenate(edges_list)
+
+def messages_infection_batches(dataset, seed_set, replicates: int, replicate, edge, keep=None):
+    '''
+    function that spread the infection from the seeds along successful messages drawn by sample_messages
+    output: the same matrix of replicate_infection_batches
+    '''
+    infected_at = initial_state(dataset, seed_set, replicates)
+    if keep is not None:
+        kept = keep[edge]
+        replicate, edge = replicate[kept], edge[kept]
+    relax_replicates(dataset, infected_at, 0, replicates, replicate, edge)
+    return infected_at
+
+class MessageIndex:
+
+    def __init__(self, dataset, replicates: int, replicate, edge):
+        '''
+        init function of the class MessageIndex
+        the successful messages drawn by sample_messages are indexed by replicate and sender, so an infection is spread
+        only along the messages sent by the infected nodes (worklist relaxation), that are few for small seed sets
+        '''
+        self.dataset = dataset
+        self.replicates = replicates
+        num_nodes = dataset.num_nodes
+
+        sender = replicate * num_nodes + dataset.src[edge]
+        order = np.argsort(sender, kind='stable')
+        self.edge = edge[order]
+        self.dst = (replicate * num_nodes + dataset.dst[edge])[order]
+        self.batch = dataset.batch_ids()[edge][order]
+
+        # the messages sent by the node n of the replicate r are the ones from offsets[r * num_nodes + n] to offsets[r * num_nodes + n + 1]
+        self.offsets = np.searchsorted(sender[order], np.arange(replicates * num_nodes + 1))
+
+    def infection_batches(self, seed_set, keep=None):
+        '''
+        function that spread the infection from the seeds along the successful messages
+        input: seed_set is the set of original infected nodes, keep is the boolean array of the edges that are not removed
+        output: the same matrix of messages_infection_batches
+        '''
+        num_nodes = self.dataset.num_nodes
+        infected_at = initial_state(self.dataset, [seed for seed in seed_set if seed < num_nodes], self.replicates)
+        flat = infected_at.reshape(-1)
+
+        frontier = np.flatnonzero(flat != NOT_INFECTED)
+        while len(frontier) > 0:
+            # positions of the messages sent by the nodes of the frontier
+            starts, counts = self.offsets[frontier], self.offsets[frontier + 1] - self.offsets[frontier]
+            total = int(counts.sum())
+            if total == 0:
+                break
+            firsts = np.cumsum(counts) - counts
+            positions = np.repeat(starts - firsts, counts) + np.arange(total)
+
+            # a message infects its dst if it is sent after the infection of its src
+            active = self.batch[positions] > np.repeat(flat[frontier], counts)
+            if keep is not None:
+                active &= keep[self.edge[positions]]
+            dst, batch = self.dst[positions[active]], self.batch[positions[active]]
+
+            # the nodes infected earlier than before have to send their messages again
+            before = flat[dst]
+            np.minimum.at(flat, dst, batch)
+            changed = np.zeros(len(flat), dtype=bool)
+            changed[dst[flat[dst] < before]] = True
+            frontier = np.flatnonzero(changed)
+
+        if len(seed_set) > 0 and max(seed_set) >= num_nodes:
+            # the seeds that don't appear in the dataset don't send messages, but they are infected
+            full = initial_state(self.dataset, seed_set, self.replicates)
+            full[:, :num_nodes] = infected_at
+            return full
+        return infected_at
+
+def checkpoint_infection(dataset, seed_set, prob: float, replicates: int, rng=None) -> Checkpoint:
+    '''
+    function that simulate replicates of the infection without removed nodes and keep their successful messages,
+    so that resume_infection can evaluate attack sets on the same random numbers
+    input: the same of replicate_infection_batches, without keep
+    output: the Checkpoint of the run
+    '''
+    replicate, edge = sample_messages(dataset, prob, replicates, rng)
+    return Checkpoint(messages_infection_batches(dataset, seed_set, replicates, replicate, edge), replicate, edge)
+
+def resume_infection(dataset, checkpoint: Checkpoint, removed_nodes):
+    '''
+    function that evaluate an attack set starting from the checkpoint: the infections before the first batch with an
+    edge of a removed node are copied, only the successful messages from that batch on are relaxed again
+    output: the same matrix that replicate_infection_batches returns with the same random numbers and keep_mask(removed_nodes)
+    '''
+    first_edge = dataset.first_incident_edge(removed_nodes)
+    if first_edge is None:
+        return checkpoint.infected_at.copy()
+    start_batch = dataset.batch_ids()[first_edge]
+
+    # state at the start of the batch: the infections of the previous batches
+    infected_at = np.where(checkpoint.infected_at < start_batch, checkpoint.infected_at, NOT_INFECTED)
+
+    # successful messages from the first edge on that are not removed
+    suffix = checkpoint.edge >= dataset.batch_offsets[start_batch]
+    replicate, edge = checkpoint.replicate[suffix], checkpoint.edge[suffix]
+    kept = dataset.keep_mask(removed_nodes)[edge]
+    relax_replicates(dataset, infected_at, 0, len(infected_at), replicate[kept], edge[kept])
+    return infected_at
+
+def infection_batches(dataset, seed_set, prob: float, rng=None, keep=None):
+    '''
+    function that simulate the infection and return when each node has been infected
+    input: the same of replicate_infection_batches, without the number of replicates
+    output: array with the batch in which each node has been infected (-1 for the seeds, NOT_INFECTED for the nodes never infected)
+    '''
+    return replicate_infection_batches(dataset, seed_set, prob, 1, rng, keep)[0]
+
+# ------------------------- results -------------------------
+
+def infection_curve(dataset, infected_at, keep=None):
+    '''
+    function that return the number of infected nodes after each batch
+    input: dataset is the TemporalDataset of the graph, infected_at is the output of infection_batches (or the matrix of
+    replicate_infection_batches), keep is the boolean array of the edges that are not removed: the batches without edges
+    are skipped, as if their edges were not in the file
+    output: list with the number of infected nodes after each batch (array with a curve for each replicate for a matrix)
+    '''
+    if infected_at.ndim == 2:
+        return np.array([infection_curve(dataset, replicate, keep) for replicate in infected_at], dtype=np.int64).reshape(len(infected_at), -1)
+
+    seeds = int(np.count_nonzero(infected_at == -1))
+    new_infected = infected_at[(infected_at >= 0) & (infected_at != NOT_INFECTED)]
+    curve = seeds + np.cumsum(np.bincount(new_infected, minlength=dataset.num_batches))
+    if keep is not None and dataset.num_batches > 0:
+        curve = curve[np.add.reduceat(keep, dataset.batch_offsets[:-1]) > 0]
+    return curve.tolist()
+
+def infected_nodes(infected_at) -> set[int]:
+    '''
+    function that return the set of nodes infected in the simulation
+    '''
+    return set(np.flatnonzero(infected_at != NOT_INFECTED).tolist())
+
+def infected_counts(infected_at):
+    '''
+    function that return the number of infected nodes of each replicate
+    input: infected_at is the matrix of replicate_infection_batches
+    output: array with the final size of the infection in each replicate
+    '''
+    return np.count_nonzero(infected_at != NOT_INFECTED, axis=1)
@@ -0,0 +1,345 @@
+'''
+file that define the loader of the temporal networks
+
+the format of each file (delimiter, header and order of the columns) is detected once, the edges are read through the
+binary cache of edgeCache and every module of the same process receives the same TemporalDataset object.
+the worker processes of the simulations attach the arrays that the parent has placed in shared memory, without reading the file
+'''
+
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from edgeCache import load_edge_arrays
+
+# possible delimiters between the columns, None means any whitespace
+DELIMITERS = (',', '\t', ';', None)
+
+# accepted names of the columns when the file has an header
+COLUMN_NAMES = {
+    'src': ('src', 'source', 'from', 'u', 'sender'),
+    'dst': ('dst', 'target', 'to', 'v', 'receiver', 'destination'),
+    'unixts': ('unixts', 'timestamp', 'ts', 'time', 't'),
+}
+
+SNIFF_LINES = 200
+
+# number of edge masks of attack sets kept by each dataset
+KEEP_MASK_CACHE = 256
+
+# arrays of a dataset placed in shared memory for the worker processes
+SHARED_ARRAYS = ('src', 'dst', 'unixts', 'batch_offsets', 'batch_ids', 'out_offsets', 'out_edges', 'in_offsets', 'in_edges')
+INCIDENT_ARRAYS = ('out_offsets', 'out_edges', 'in_offsets', 'in_edges')
+
+# ------------------------- class TemporalDataset -------------------------
+
+class TemporalDataset:
+
+    def __init__(self, filename, src, dst, unixts, num_nodes=None, batch_offsets=None):
+        '''
+        init function of the class TemporalDataset
+        src, dst and unixts are the arrays with the columns of the edges, they are sorted by unixts
+        (keeping the file order between edges with the same unixts) if the file is not already sorted
+        batch_offsets can be passed when they are already known (e.g. by a worker process that attaches a shared dataset)
+        '''
+        if len(unixts) > 1 and np.any(unixts[1:] < unixts[:-1]):
+            order = np.argsort(unixts, kind='stable')
+            src, dst, unixts = src[order], dst[order], unixts[order]
+
+        self.filename = filename
+        self.src = src
+        self.dst = dst
+        self.unixts = unixts
+
+        # node ids go from 0 to num_nodes - 1
+        if num_nodes is None:
+            num_nodes = int(max(src.max(), dst.max())) + 1 if len(src) > 0 else 0
+        self.num_nodes = num_nodes
+
+        # the edges of the batch i (the messages sent with the same unixts) are the ones
+        # in the positions from batch_offsets[i] to batch_offsets[i + 1]
+        if batch_offsets is None:
+            batch_offsets = np.concatenate(([0], np.flatnonzero(np.diff(unixts)) + 1, [len(unixts)])) if len(unixts) > 0 else np.zeros(1, dtype=np.int64)
+        self.batch_offsets = batch_offsets
+        self.num_batches = len(self.batch_offsets) - 1
+
+        self._batch_ids = None
+        self._columns = None
+        self._edge_list = None
+
+        self._incident_index = None
+
+        # edge masks of the last attack sets, the key is the frozenset of the removed nodes
+        self._keep_masks = {}
+
+    def __len__(self):
+        return len(self.src)
+
+    def columns(self):
+        '''
+        function that return src, dst and unixts as lists of python ints, built only once
+        slicing them with batch_offsets is much faster than reading single elements of the arrays
+        '''
+        if self._columns is None:
+            self._columns = (self.src.tolist(), self.dst.tolist(), self.unixts.tolist())
+        return self._columns
+
+    def edge_list(self):
+        '''
+        function that return the edges as a tuple of (src, dst, unixts) python ints
+        the tuple is built only once, so the loops in pure python don't convert the arrays at each simulation
+        '''
+        if self._edge_list is None:
+            self._edge_list = tuple(zip(*self.columns()))
+        return self._edge_list
+
+    def batches(self):
+        '''
+        function that return the list of (start, end) positions of each batch
+        '''
+        offsets = self.batch_offsets.tolist()
+        return list(zip(offsets, offsets[1:]))
+
+    def batch_ids(self):
+        '''
+        function that return the array with the batch of each edge, built only once
+        '''
+        if self._batch_ids is None:
+            self._batch_ids = np.repeat(np.arange(self.num_batches, dtype=np.int64), np.diff(self.batch_offsets))
+        return self._batch_ids
+
+    def incident_index(self):
+        '''
+        function that return the index of the edges incident to each node, built only once
+        output: out_offsets, out_edges, in_offsets, in_edges: the positions of the edges sent by the node i are
+        out_edges[out_offsets[i]:out_offsets[i + 1]], the ones of the edges received are in in_edges, both sorted by time
+        '''
+        if self._incident_index is None:
+            index = []
+            for column in (self.src, self.dst):
+                # the sort is stable and the edges are sorted by time, so the edges of each node stay sorted by time
+                offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+                np.cumsum(np.bincount(column, minlength=self.num_nodes), out=offsets[1:])
+                index += [offsets, np.argsort(column, kind='stable')]
+            self._incident_index = tuple(index)
+        return self._incident_index
+
+    def degrees(self):
+        '''
+        function that return the arrays with the number of edges sent and received by each node
+        '''
+        out_offsets, _, in_offsets, _ = self.incident_index()
+        return np.diff(out_offsets), np.diff(in_offsets)
+
+    def incident_edges(self, nodes):
+        '''
+        function that return the sorted positions of the edges that have one of the nodes as src or dst
+        the ids that don't appear in the dataset are ignored
+        '''
+        out_offsets, out_edges, in_offsets, in_edges = self.incident_index()
+        edges = [np.zeros(0, dtype=np.int64)]
+        for node in nodes:
+            if 0 <= node < self.num_nodes:
+                edges.append(out_edges[out_offsets[node]:out_offsets[node + 1]])
+                edges.append(in_edges[in_offsets[node]:in_offsets[node + 1]])
+        return np.unique(np.concatenate(edges))
+
+    def first_incident_edge(self, nodes):
+        '''
+        function that return the position of the first edge that has one of the nodes as src or dst
+        output: the position, or None if the nodes don't have edges
+        '''
+        out_offsets, out_edges, in_offsets, in_edges = self.incident_index()
+        first = None
+        for node in nodes:
+            if 0 <= node < self.num_nodes:
+                # the edges of each node are sorted by time, so the first one is the earliest
+                for offsets, edges in ((out_offsets, out_edges), (in_offsets, in_edges)):
+                    if offsets[node] < offsets[node + 1] and (first is None or edges[offsets[node]] < first):
+                        first = int(edges[offsets[node]])
+        return first
+
+    def removed_interactions(self, removed_nodes) -> int:
+        '''
+        function that return the number of edges removed by an attack set
+        '''
+        return len(self.incident_edges(set(removed_nodes)))
+
+    def nodes(self) -> set:
+        '''
+        function that return the set of the nodes that appear in at least one edge
+        '''
+        return set(np.union1d(self.src, self.dst).tolist())
+
+    def keep_mask(self, removed_nodes):
+        '''
+        function that return the boolean array of the edges that don't have a removed node as src or dst
+        the mask of each attack set is computed once and cached, so it must not be modified
+        output: the boolean array, or None if no node is removed
+        '''
+        if len(removed_nodes) == 0:
+            return None
+
+        key = frozenset(removed_nodes)
+        keep = self._keep_masks.pop(key, None)
+        if keep is None:
+            # only the edges incident to the removed nodes are touched
+            out_offsets, out_edges, in_offsets, in_edges = self.incident_index()
+            keep = np.ones(len(self), dtype=bool)
+            for node in key:
+                if 0 <= node < self.num_nodes:
+                    keep[out_edges[out_offsets[node]:out_offsets[node + 1]]] = False
+                    keep[in_edges[in_offsets[node]:in_offsets[node + 1]]] = False
+            keep.flags.writeable = False
+            if len(self._keep_masks) >= KEEP_MASK_CACHE:
+                # the least recently used mask is the first one
+                del self._keep_masks[next(iter(self._keep_masks))]
+        self._keep_masks[key] = keep
+        return keep
+
+    def __repr__(self):
+        return f"{self.filename}: {len(self)} edges, {self.num_nodes} nodes, {self.num_batches} batches"
+
+# ------------------------- format detection -------------------------
+
+def split_line(line: str, delimiter):
+    return [field.strip() for field in line.strip().split(delimiter)]
+
+def is_int(field: str) -> bool:
+    try:
+        int(field)
+        return True
+    except ValueError:
+        return False
+
+def sniff_format(filename: str) -> dict:
+    '''
+    function that detect the format of a file containing a temporal edge list
+    input: filename is the name of the file containing the graph
+    output: dictionary with the delimiter, if the file has an header and the positions of the src, dst and unixts columns
+    '''
+    with open(filename, 'r') as f:
+        lines = [line for line in (f.readline() for _ in range(SNIFF_LINES)) if line.strip()]
+    if not lines:
+        return {'delimiter': None, 'header': False, 'columns': [0, 1, 2]}
+
+    # the delimiter is the first one that split every line in the same number of (at least 3) columns
+    delimiter = None
+    for candidate in DELIMITERS:
+        if candidate is not None and candidate not in lines[0]:
+            continue
+        widths = set(len(split_line(line, candidate)) for line in lines)
+        if len(widths) == 1 and widths.pop() >= 3:
+            delimiter = candidate
+            break
+
+    first_row = split_line(lines[0], delimiter)
+    header = not all(is_int(field) for field in first_row)
+
+    if header:
+        names = [field.lower() for field in first_row]
+        columns = []
+        for column in ('src', 'dst', 'unixts'):
+            matches = [i for i, name in enumerate(names) if name in COLUMN_NAMES[column]]
+            if not matches:
+                raise ValueError(f"{filename}: no column named as {column} in the header {first_row}")
+            columns.append(matches[0])
+    else:
+        # without an header the order of the columns can't be known, it is the documented src dst unixts
+        columns = [0, 1, 2]
+
+    return {'delimiter': delimiter, 'header': header, 'columns': columns}
+
+# ------------------------- loading -------------------------
+
+# datasets already loaded by this process
+_datasets = {}
+
+def load_dataset(filename: str) -> TemporalDataset:
+    '''
+    function that load a temporal graph, the file is read only the first time it is requested by the process
+    input: filename is the name of the file containing the graph
+    output: the TemporalDataset of the file
+    '''
+    key = os.path.abspath(filename)
+    if key not in _datasets:
+        src, dst, unixts = load_edge_arrays(filename, **sniff_format(filename))
+        _datasets[key] = TemporalDataset(filename, src, dst, unixts)
+    return _datasets[key]
+
+# ------------------------- shared memory -------------------------
+
+# shared memory blocks created or attached by this process, they must stay open as long as the arrays that use them
+_shared_blocks = []
+
+def share_dataset(filename: str) -> dict:
+    '''
+    function that copy the arrays of a dataset in shared memory
+    input: filename is the name of the file containing the graph
+    output: the handle of the shared dataset (name, dtype and shape of each block), that can be pickled and passed to attach_dataset
+    '''
+    dataset = load_dataset(filename)
+    handle = {'key': os.path.abspath(filename), 'filename': filename, 'num_nodes': dataset.num_nodes, 'arrays': {}}
+    arrays = {name: getattr(dataset, name) for name in ('src', 'dst', 'unixts', 'batch_offsets')}
+    arrays['batch_ids'] = dataset.batch_ids()
+    arrays.update(zip(INCIDENT_ARRAYS, dataset.incident_index()))
+    for name in SHARED_ARRAYS:
+        values = arrays[name]
+        # a block can't be empty
+        block = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        _shared_blocks.append(block)
+        np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+        handle['arrays'][name] = (block.name, values.dtype.str, values.shape)
+    return handle
+
+def attach_dataset(handle: dict) -> TemporalDataset:
+    '''
+    function that build a dataset on the shared memory blocks of share_dataset, without copying them, and register it
+    so that load_dataset returns it
+    input: handle is the output of share_dataset
+    output: the TemporalDataset of the shared arrays
+    '''
+    arrays = {}
+    for name, (block_name, dtype, shape) in handle['arrays'].items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype, buffer=block.buf)
+        arrays[name].flags.writeable = False
+
+    dataset = TemporalDataset(handle['filename'], arrays['src'], arrays['dst'], arrays['unixts'], handle['num_nodes'], arrays['batch_offsets'])
+    dataset._batch_ids = arrays['batch_ids']
+    dataset._incident_index = tuple(arrays[name] for name in INCIDENT_ARRAYS)
+    _datasets[handle['key']] = dataset
+    return dataset
+
+def attach_datasets(handles: list):
+    '''
+    initializer of the worker processes: it attaches all the shared datasets
+    '''
+    for handle in handles:
+        attach_dataset(handle)
+
+def release_dataset(handle: dict):
+    '''
+    function that free the shared memory blocks created by share_dataset
+    '''
+    names = set(block_name for block_name, _, _ in handle['arrays'].values())
+    for block in [block for block in _shared_blocks if block.name in names]:
+        _shared_blocks.remove(block)
+        block.close()
+        block.unlink()
+
+@contextmanager
+def shared_datasets(filenames):
+    '''
+    context manager that place the datasets in shared memory and free them at the end
+    output: the list of the handles, to pass to attach_datasets
+    '''
+    handles = [share_dataset(filename) for filename in filenames]
+    try:
+        yield handles
+    finally:
+        for handle in handles:
+            release_dataset(handle)
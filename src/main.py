@@ -1,14 +1,19 @@
 from copy import deepcopy
 import sys
 from temporalGraph import influence_maximization, spread_infection
+from rrSets import rr_influence_maximization
 from subTreeInfection import subtrees_methods
 from vsCentrality import centrality_analysis
+from celf import celf_attack_set
 from comparison import result_comparison
 from degreeNodes import degree_nodes
 from cc import compare_cc
 
 filename = sys.argv[1]
 node_budget = int(sys.argv[2])
+workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+seed_method = sys.argv[4] if len(sys.argv) > 4 else 'windows'
+attack_method = sys.argv[5] if len(sys.argv) > 5 else None
 
 def adversarial_attack_at_influence_maximization ():
     '''
@@ -16,13 +21,20 @@ def adversarial_attack_at_influence_maximization ():
     
     it is needed to call this function with:
         - argv[1]: the name of the relative file's path containing the graph to analyze (e.g. data/email.txt)
+        - argv[2]: the number of nodes to remove
+        - argv[3]: optional, the number of processes used by the simulations (default 1)
+        - argv[4]: optional, how the seed set is found: 'windows' (the top degree node of each window, default)
+          or 'rr' (the same number of seeds chosen with RR sets)
+        - argv[5]: optional, 'celf' to also find the attack set with the lazy greedy on the simulated spread (it is only printed)
     '''
     
     prob_of_being_infected = 0.2
     
     print('---- find seed set ----\n\n')
     
-    seed_set = influence_maximization(filename, prob_of_being_infected)
+    seed_set = influence_maximization(filename, prob_of_being_infected, workers=workers)
+    if seed_method == 'rr':
+        seed_set = rr_influence_maximization(filename, len(seed_set), prob_of_being_infected)
     print('seed set:', seed_set)
     
     
@@ -33,11 +45,17 @@ def adversarial_attack_at_influence_maximization ():
     
     print('\n\n---- minimize infection with subtrees ----\n\n')
     
-    subtree = subtrees_methods(filename, set(seed_set), node_budget, prob_of_being_infected)
+    subtree = subtrees_methods(filename, set(seed_set), node_budget, prob_of_being_infected, workers)
     
     print('\n\n---- minimize infection with centrality ----\n\n')
     
-    centrality = centrality_analysis(filename, set(seed_set), node_budget, set(subtree), prob_of_being_infected)
+    centrality = centrality_analysis(filename, set(seed_set), node_budget, set(subtree), prob_of_being_infected, workers)
+    
+    if attack_method == 'celf':
+        print('\n\n---- minimize infection with lazy greedy ----\n\n')
+        
+        greedy = celf_attack_set(filename, set(seed_set), node_budget, prob_of_being_infected)
+        print('attack set:', greedy)
     
     print('\n\n---- result comparison ----\n\n')
     
@@ -0,0 +1,257 @@
+'''
+file that define the parallel runner of the Monte Carlo replicates
+
+the replicates are split in tasks of a fixed size and each task receives its own numpy SeedSequence, spawned from a
+single root seed: the random numbers of a task don't depend on the worker that runs it, so the results are the same
+with any number of workers. the tasks return only small summaries (counts), never the infected sets.
+the workers don't read the dataset: its arrays are placed in shared memory by the parent and attached when a worker starts.
+the pool and the shared arrays are created by the first parallel run on a file and reused by the next runs on the same file,
+so an analysis that runs the replicates in many calls starts the workers and copies the dataset only once.
+
+the attack sets are compared with common random numbers: the kernel draws one uniform for each edge of each replicate,
+also for the removed edges, so the runs with the same root seed give the same draws to every attack set
+and the differences between the attack sets are not hidden by the noise of independent simulations.
+
+compare_counts evaluates many attack sets on the same replicates: the run without removed nodes is simulated once and
+each attack set is resumed from its checkpoint (see infectionKernel).
+
+estimate_counts doesn't use a fixed number of replicates: it keeps simulating, in rounds of growing size, until the
+confidence interval of the mean number of infected nodes is narrow enough or the budget of replicates is finished;
+sample_votes does the same with the forests, until at most one of the most voted nodes changes between two rounds
+'''
+
+import atexit
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import random
+from statistics import NormalDist, fmean, stdev
+from typing import NamedTuple
+
+import numpy as np
+
+from loader import attach_datasets, load_dataset, release_dataset, share_dataset
+from infectionKernel import checkpoint_infection, infected_counts, replicate_infection_batches, resume_infection
+
+# default number of replicates simulated by each task
+REPLICATES_PER_TASK = 10
+
+# default stopping rule of estimate_counts: relative half width of the confidence interval, confidence level,
+# replicates of the first round and maximum number of replicates
+REL_WIDTH = 0.02
+CONFIDENCE = 0.95
+MIN_REPLICATES = 20
+MAX_REPLICATES = 1000
+
+# default number of the budget most voted nodes that can change between two rounds of sample_votes
+# (with a budget of one node it must not change)
+VOTES_TOLERANCE = 1
+
+# process pool of the dataset shared with the workers and the handle of its shared arrays,
+# the key is the absolute path of the file and the number of workers
+_pools = {}
+
+class Estimate(NamedTuple):
+    '''
+    result of estimate_counts: mean number of infected nodes, half width of its confidence interval,
+    number of replicates used and number of infected nodes in each replicate
+    '''
+    mean: float
+    half_width: float
+    replicates: int
+    counts: list
+
+    def __str__(self):
+        return f"{self.mean:.2f} ± {self.half_width:.2f} ({self.replicates} replicates)"
+
+# ------------------------- seeds -------------------------
+
+def root_seed_sequence(seed=None) -> np.random.SeedSequence:
+    '''
+    function that return the root SeedSequence of a run
+    if no seed is passed, it is drawn from the random module, so random.seed keeps the runs reproducible
+    (a SeedSequence is returned as it is)
+    '''
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if seed is None:
+        seed = random.getrandbits(64)
+    return np.random.SeedSequence(seed)
+
+def python_random(seed_sequence: np.random.SeedSequence) -> random.Random:
+    '''
+    function that return a random.Random generator seeded by a SeedSequence, for the code that uses the random module api
+    '''
+    return random.Random(int(seed_sequence.generate_state(1, np.uint64)[0]))
+
+# ------------------------- runner -------------------------
+
+def replicate_pool(filename: str, workers: int) -> ProcessPoolExecutor:
+    '''
+    function that return the process pool whose workers have attached the dataset of filename
+    the pool is started only the first time, the pool of another file or number of workers is shut down before
+    '''
+    key = (os.path.abspath(filename), workers)
+    if key not in _pools:
+        close_pools()
+        handle = share_dataset(filename)
+        _pools[key] = (ProcessPoolExecutor(max_workers=workers, initializer=attach_datasets, initargs=([handle],)), handle)
+    return _pools[key][0]
+
+def close_pools():
+    '''
+    function that shut down the process pools and free their shared memory, it is also called when the program exits
+    '''
+    for executor, handle in _pools.values():
+        executor.shutdown()
+        release_dataset(handle)
+    _pools.clear()
+
+atexit.register(close_pools)
+
+def run_replicates(task, times: int, args: tuple = (), workers: int = 1, seed=None, replicates_per_task: int = REPLICATES_PER_TASK) -> list:
+    '''
+    function that run times replicates of a task, in parallel if workers > 1
+    input: task is a module level function called as task(*args, replicates, seed_sequence) that return a summary of
+    its replicates (the first argument is the filename of the dataset, that is shared with the workers), times is the total number of replicates, workers is the number of processes, seed is the root seed
+    output: the list of the results of the tasks, in the same order for any number of workers
+    '''
+    sizes = [min(replicates_per_task, times - first) for first in range(0, times, replicates_per_task)]
+    seed_sequences = root_seed_sequence(seed).spawn(len(sizes))
+
+    if workers <= 1 or len(sizes) <= 1:
+        return [task(*args, size, seed_sequence) for size, seed_sequence in zip(sizes, seed_sequences)]
+
+    executor = replicate_pool(args[0], workers)
+    futures = [executor.submit(task, *args, size, seed_sequence) for size, seed_sequence in zip(sizes, seed_sequences)]
+    return [future.result() for future in futures]
+
+def merge_counts(results) -> Counter:
+    '''
+    function that sum the dictionaries of counts returned by the tasks
+    '''
+    total = Counter()
+    for counts in results:
+        total.update(counts)
+    return total
+
+# ------------------------- tasks -------------------------
+
+def count_infected(filename: str, seed_set: set, prob: float, removed_nodes, replicates: int, seed_sequence) -> list[int]:
+    '''
+    task that simulate replicates infections and return the number of infected nodes of each one
+    '''
+    dataset = load_dataset(filename)
+    infected_at = replicate_infection_batches(dataset, seed_set, prob, replicates, np.random.default_rng(seed_sequence), dataset.keep_mask(removed_nodes))
+    return infected_counts(infected_at).tolist()
+
+def simulate_counts(filename: str, seed_set: set, prob: float, times: int, removed_nodes=(), workers: int = 1, seed=None) -> list[int]:
+    '''
+    function that simulate times infections, in parallel if workers > 1
+    two calls with the same seed use the same random numbers for any removed_nodes (common random numbers)
+    output: the number of infected nodes in each simulation
+    '''
+    results = run_replicates(count_infected, times, (filename, seed_set, prob, removed_nodes), workers, seed)
+    return [count for counts in results for count in counts]
+
+def count_infected_sets(filename: str, seed_set: set, prob: float, attack_sets: list, replicates: int, seed_sequence) -> list[list[int]]:
+    '''
+    task that simulate replicates infections without removed nodes and resume them for each attack set
+    output: the number of infected nodes of each replicate, without removed nodes and then for each attack set
+    '''
+    dataset = load_dataset(filename)
+    checkpoint = checkpoint_infection(dataset, seed_set, prob, replicates, np.random.default_rng(seed_sequence))
+    counts = [infected_counts(checkpoint.infected_at).tolist()]
+    for removed_nodes in attack_sets:
+        counts.append(infected_counts(resume_infection(dataset, checkpoint, removed_nodes)).tolist())
+    return counts
+
+def compare_counts(filename: str, seed_set: set, prob: float, times: int, attack_sets: list, workers: int = 1, seed=None) -> list[list[int]]:
+    '''
+    function that simulate times infections without removed nodes and with each attack set, in parallel if workers > 1
+    the replicate i uses the same random numbers for all the attack sets, and the same of simulate_counts with the same seed
+    output: the number of infected nodes in each simulation, without removed nodes and then for each attack set
+    '''
+    results = run_replicates(count_infected_sets, times, (filename, seed_set, prob, list(attack_sets)), workers, seed)
+    return [[count for counts in results for count in counts[i]] for i in range(len(attack_sets) + 1)]
+
+# ------------------------- adaptive estimate -------------------------
+
+def confidence_interval(values: list, confidence: float = CONFIDENCE):
+    '''
+    function that return the mean of the values and the half width of its normal confidence interval
+    '''
+    mean = fmean(values)
+    if len(values) < 2:
+        return mean, math.inf
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return mean, z * stdev(values, mean) / math.sqrt(len(values))
+
+def adaptive_estimates(simulate_round, rel_width: float, confidence: float, min_replicates: int, max_replicates: int, seed=None) -> list[Estimate]:
+    '''
+    function that run rounds of replicates until the confidence interval of every mean is narrow enough
+    each round doubles the number of replicates and has its own SeedSequence, spawned from the root seed
+    input: simulate_round(replicates, seed_sequence) return, for each estimated quantity, the values of the replicates
+    output: the Estimate of each quantity
+    '''
+    root = root_seed_sequence(seed)
+    values = None
+    round_size = min(min_replicates, max_replicates)
+    while True:
+        results = simulate_round(round_size, root.spawn(1)[0])
+        values = results if values is None else [old + new for old, new in zip(values, results)]
+        intervals = [confidence_interval(counts, confidence) for counts in values]
+        replicates = len(values[0])
+        if all(half_width <= rel_width * mean for mean, half_width in intervals) or replicates >= max_replicates:
+            return [Estimate(mean, half_width, replicates, counts) for (mean, half_width), counts in zip(intervals, values)]
+        round_size = min(replicates, max_replicates - replicates)
+
+def estimate_counts(filename: str, seed_set: set, prob: float, removed_nodes=(), rel_width: float = REL_WIDTH, confidence: float = CONFIDENCE,
+                    min_replicates: int = MIN_REPLICATES, max_replicates: int = MAX_REPLICATES, workers: int = 1, seed=None) -> Estimate:
+    '''
+    function that estimate the mean number of infected nodes, simulating until the half width of the confidence interval
+    is at most rel_width times the mean or max_replicates simulations have been done
+    two calls with the same seed use the same random numbers for any removed_nodes (common random numbers)
+    output: the Estimate of the mean number of infected nodes
+    '''
+    def simulate_round(replicates, seed_sequence):
+        return [simulate_counts(filename, seed_set, prob, replicates, removed_nodes, workers, seed_sequence)]
+    return adaptive_estimates(simulate_round, rel_width, confidence, min_replicates, max_replicates, seed)[0]
+
+def estimate_attack_sets(filename: str, seed_set: set, prob: float, attack_sets: list, rel_width: float = REL_WIDTH, confidence: float = CONFIDENCE,
+                         min_replicates: int = MIN_REPLICATES, max_replicates: int = MAX_REPLICATES, workers: int = 1, seed=None) -> list[Estimate]:
+    '''
+    function that estimate the mean number of infected nodes without removed nodes and with each attack set, on the same
+    replicates, until all the confidence intervals are narrow enough (see estimate_counts)
+    output: the Estimate without removed nodes and then the Estimate of each attack set
+    '''
+    def simulate_round(replicates, seed_sequence):
+        return compare_counts(filename, seed_set, prob, replicates, attack_sets, workers, seed_sequence)
+    return adaptive_estimates(simulate_round, rel_width, confidence, min_replicates, max_replicates, seed)
+
+def top_voted(votes: Counter, budget: int) -> set:
+    '''
+    function that return the budget nodes with the most votes
+    '''
+    return set(node for node, _ in votes.most_common(budget))
+
+def sample_votes(task, args: tuple, budget: int, min_replicates: int, max_replicates: int, workers: int = 1, seed=None, tolerance: int = VOTES_TOLERANCE):
+    '''
+    function that sample forests with a task that return the votes of its replicates (see run_replicates), doubling the
+    number of replicates until at most tolerance of the budget most voted nodes are different from the previous round
+    or max_replicates forests have been sampled. the nodes near the cut have almost the same votes and swap places
+    for a long time, so requiring the same nodes would almost always sample max_replicates forests
+    output: the merged votes and the number of replicates used
+    '''
+    root = root_seed_sequence(seed)
+    votes = Counter()
+    replicates, round_size = 0, min(min_replicates, max_replicates)
+    top = None
+    while True:
+        votes.update(merge_counts(run_replicates(task, round_size, args, workers, root.spawn(1)[0], replicates_per_task=1)))
+        replicates += round_size
+        top, previous_top = top_voted(votes, budget), top
+        if previous_top is not None and len(top - previous_top) <= min(tolerance, budget - 1) or replicates >= max_replicates:
+            return votes, replicates
+        round_size = min(replicates, max_replicates - replicates)
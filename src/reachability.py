@@ -0,0 +1,111 @@
+'''
+file that define the index of the nodes reachable by time-respecting paths
+
+a node infected before the batch b can infect only the nodes reachable with a path of messages sent in increasing
+batches from b on, so the size of the union of the reachable sets of the seeds is an upper bound of the number of
+infected nodes in any simulation (it is the number of infected nodes when prob is 1). the reachable sets are computed
+in one backward sweep over the batches: the set of a sender grows with the dst of each message and with the set of
+the dst after the batch (the infection can't cross two messages of the same batch). the sets are python ints used as bitsets
+'''
+
+import numpy as np
+
+from loader import load_dataset
+
+# ------------------------- class ReachabilityIndex -------------------------
+
+class ReachabilityIndex:
+
+    def __init__(self, filename: str, start=None, removed_nodes=(), targets=None):
+        '''
+        init function of the class ReachabilityIndex
+        input: filename is the name of the file containing the graph, start is the unixts from which the paths start
+        (None for the first message), removed_nodes are the nodes removed from the graph, targets are the nodes that
+        are counted in the reachable sets (None for all the nodes, a sample keeps the bitsets small on large graphs)
+        '''
+        self.dataset = load_dataset(filename)
+        num_nodes = self.dataset.num_nodes
+
+        # bit of each node in the bitsets, 0 for the nodes that are not targets
+        if targets is None:
+            self.bits = [1 << node for node in range(num_nodes)]
+        else:
+            targets = sorted(set(targets))
+            self.bits = [0] * num_nodes
+            for position, node in enumerate(targets):
+                if 0 <= node < num_nodes:
+                    self.bits[node] = 1 << position
+        self.reachable = self.backward_sweep(start, self.dataset.keep_mask(removed_nodes))
+
+    def backward_sweep(self, start, keep) -> list[int]:
+        '''
+        function that compute the bitset of the nodes reachable from each node, visiting the batches backwards
+        '''
+        src_ids, dst_ids, _ = self.dataset.columns()
+        keep = keep.tolist() if keep is not None else None
+        first = int(np.searchsorted(self.dataset.unixts, start, side='left')) if start is not None else 0
+
+        bits = self.bits
+        reachable = [0] * self.dataset.num_nodes
+        for batch_start, batch_end in reversed(self.dataset.batches()):
+            if batch_end <= first:
+                break
+
+            # the sets are updated after the batch, so a path doesn't use two messages of the same batch
+            updates = {}
+            for position in range(batch_start, batch_end):
+                if keep is None or keep[position]:
+                    src, dst = src_ids[position], dst_ids[position]
+                    updates[src] = updates.get(src, 0) | bits[dst] | reachable[dst]
+            for src, update in updates.items():
+                reachable[src] |= update
+        return reachable
+
+    def reachable_set(self, seed_set) -> int:
+        '''
+        function that return the bitset of the nodes reachable from the seeds, the seeds included
+        '''
+        bitset = 0
+        for seed in seed_set:
+            if 0 <= seed < self.dataset.num_nodes:
+                bitset |= self.bits[seed] | self.reachable[seed]
+        return bitset
+
+    def reachable_nodes(self, node: int) -> set[int]:
+        '''
+        function that return the ids of the targets reachable from node, node included
+        '''
+        positions = {self.bits[target].bit_length() - 1: target for target in range(self.dataset.num_nodes) if self.bits[target]}
+        bitset = self.reachable_set([node])
+        nodes = set()
+        while bitset:
+            low = bitset & -bitset
+            nodes.add(positions[low.bit_length() - 1])
+            bitset ^= low
+        return nodes
+
+    def spread_bound(self, seed_set) -> int:
+        '''
+        function that return the number of targets that can be infected by the seeds (seeds included),
+        an upper bound of the number of infected targets of every simulation
+        '''
+        return self.reachable_set(seed_set).bit_count()
+
+    def counts(self, nodes=None) -> np.ndarray:
+        '''
+        function that return the number of targets reachable from each node (node included)
+        '''
+        if nodes is None:
+            nodes = range(self.dataset.num_nodes)
+        return np.array([self.spread_bound([node]) for node in nodes], dtype=np.int64)
+
+# ------------------------- Main -------------------------
+
+if __name__ == "__main__":
+
+    filename = "data/email.txt"
+    seed_set = {83, 49, 60, 85}
+
+    index = ReachabilityIndex(filename)
+    print(f"Upper bound of the infected nodes: {index.spread_bound(seed_set)}")
+    print(f"Upper bound without the node 54: {ReachabilityIndex(filename, removed_nodes={54}).spread_bound(seed_set)}")
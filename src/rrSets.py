@@ -0,0 +1,202 @@
+'''
+file that define the selection of the seed set with reverse reachable sets (RR sets), as in the IMM algorithm
+
+an RR set is the set of nodes that would infect a random target node in a random simulation: the successful messages are
+drawn only when they are needed, going backwards in time from the target. a node that has to be infected before the batch
+d can be infected by a successful message that it receives in a batch b < d, and its sender has to be infected before b.
+every message has its own uniform, so a node that receives k infected messages in a batch is infected with probability
+1 - (1 - prob)^k, as in spread_infection. the nodes are visited by decreasing deadline, so each node is visited once and
+each message is drawn at most once.
+
+the expected number of infected nodes of a seed set is num_nodes times the probability that it hits a random RR set,
+so the seeds are chosen by greedy maximum coverage of the sampled RR sets. the number of RR sets (theta) can be fixed
+or chosen by the bounds of IMM for an approximation of (1 - 1/e - epsilon) with probability 1 - 1/num_nodes^ell
+'''
+
+from array import array
+from bisect import bisect_left
+import heapq
+import math
+
+import numpy as np
+
+from loader import load_dataset
+from monteCarlo import python_random, root_seed_sequence
+
+PROB_OF_BEING_INFECTED = 0.2
+
+# default accuracy of the IMM bounds
+EPSILON = 0.5
+ELL = 1
+
+# ------------------------- class RRSets -------------------------
+
+class RRSets:
+
+    def __init__(self, filename: str, prob: float = PROB_OF_BEING_INFECTED, seed=None):
+        '''
+        init function of the class RRSets
+        the nodes of the RR set i are nodes[offsets[i]:offsets[i + 1]]
+        '''
+        self.dataset = load_dataset(filename)
+        self.prob = prob
+        self.rng = python_random(root_seed_sequence(seed))
+
+        # received messages of each node, sorted by time, as python lists (slicing them is faster than reading the arrays)
+        _, _, in_offsets, in_edges = self.dataset.incident_index()
+        self.in_offsets = in_offsets.tolist()
+        self.in_senders = self.dataset.src[in_edges].tolist()
+        self.in_batches = self.dataset.batch_ids()[in_edges].tolist()
+
+        self.nodes = array('q')
+        self.offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def reverse_reachable_set(self, target: int) -> list[int]:
+        '''
+        function that sample the nodes that infect target in a random simulation
+        output: the list of the nodes, target included
+        '''
+        in_offsets, in_senders, in_batches = self.in_offsets, self.in_senders, self.in_batches
+        skip = self.skip
+
+        # deadline of each reached node: it has to be infected before that batch
+        deadline = {target: self.dataset.num_batches}
+        heap = [(-self.dataset.num_batches, target)]
+        visited = []
+        while heap:
+            negative_deadline, node = heapq.heappop(heap)
+            if -negative_deadline < deadline[node]:
+                # the node has been reached again with a later deadline
+                continue
+            visited.append(node)
+
+            # the deadline of a sender is always lower than the one of the receiver, so the deadline of node is final
+            start = in_offsets[node]
+            end = bisect_left(in_batches, -negative_deadline, start, in_offsets[node + 1])
+            # the number of failed messages before a successful one is geometric, so only the successful ones are drawn
+            position = start + skip()
+            while position < end:
+                sender, batch = in_senders[position], in_batches[position]
+                if batch > deadline.get(sender, -1):
+                    deadline[sender] = batch
+                    heapq.heappush(heap, (-batch, sender))
+                position += 1 + skip()
+        return visited
+
+    def skip(self) -> int:
+        '''
+        function that return the number of failed messages before the next successful one
+        '''
+        if self.prob >= 1:
+            return 0
+        if self.prob <= 0:
+            return math.inf
+        return int(math.log(1 - self.rng.random()) / math.log(1 - self.prob))
+
+    def extend(self, count: int):
+        '''
+        function that sample RR sets, from uniformly random targets, until there are count RR sets
+        '''
+        num_nodes = self.dataset.num_nodes
+        for _ in range(count - len(self)):
+            self.nodes.extend(self.reverse_reachable_set(self.rng.randrange(num_nodes)))
+            self.offsets.append(len(self.nodes))
+
+    def max_coverage(self, k: int):
+        '''
+        function that choose greedily the k nodes that hit the most RR sets
+        output: the list of the nodes, in the order of selection, and the fraction of RR sets that they hit
+        '''
+        nodes = np.frombuffer(self.nodes, dtype=np.int64)
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        num_nodes = self.dataset.num_nodes
+
+        # index of the RR sets that contain each node
+        sets_of = np.argsort(nodes, kind='stable')
+        set_ids = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(offsets))[sets_of]
+        node_offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=num_nodes), out=node_offsets[1:])
+
+        counts = np.bincount(nodes, minlength=num_nodes)
+        covered = np.zeros(len(self), dtype=bool)
+        seeds = []
+        for _ in range(min(k, num_nodes)):
+            # the ties are won by the smallest id
+            node = int(np.argmax(counts))
+            seeds.append(node)
+
+            sets = set_ids[node_offsets[node]:node_offsets[node + 1]]
+            sets = sets[~covered[sets]]
+            covered[sets] = True
+
+            # the nodes of the new covered RR sets don't gain anything from them anymore
+            lengths = offsets[sets + 1] - offsets[sets]
+            members = np.repeat(offsets[sets] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            counts -= np.bincount(nodes[members], minlength=num_nodes)
+            counts[node] = -1
+
+        return seeds, float(covered.mean()) if len(self) > 0 else 0.0
+
+# ------------------------- IMM -------------------------
+
+def log_binomial(n: int, k: int) -> float:
+    '''
+    function that return the logarithm of the binomial coefficient n choose k
+    '''
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+def imm_theta(rr_sets: RRSets, k: int, epsilon: float = EPSILON, ell: float = ELL) -> int:
+    '''
+    function that return the number of RR sets needed by IMM, sampling the RR sets used to estimate
+    a lower bound of the spread of the best seed set (they are kept in rr_sets)
+    '''
+    n = rr_sets.dataset.num_nodes
+    if n < 2:
+        return 1
+    k = min(k, n)
+    ell = ell * (1 + math.log(2) / math.log(n))
+    log_choose = log_binomial(n, k)
+
+    # the lower bound is halved until the seeds chosen on theta_i RR sets hit enough of them
+    epsilon_prime = math.sqrt(2) * epsilon
+    lambda_prime = (2 + 2 / 3 * epsilon_prime) * (log_choose + ell * math.log(n) + math.log(max(math.log2(n), 1))) * n / epsilon_prime ** 2
+    lower_bound = 1
+    for i in range(1, max(2, math.ceil(math.log2(n)))):
+        x = n / 2 ** i
+        rr_sets.extend(math.ceil(lambda_prime / x))
+        _, fraction = rr_sets.max_coverage(k)
+        if n * fraction >= (1 + epsilon_prime) * x:
+            lower_bound = n * fraction / (1 + epsilon_prime)
+            break
+
+    alpha = math.sqrt(ell * math.log(n) + math.log(2))
+    beta = math.sqrt((1 - 1 / math.e) * (log_choose + ell * math.log(n) + math.log(2)))
+    lambda_star = 2 * n * ((1 - 1 / math.e) * alpha + beta) ** 2 / epsilon ** 2
+    return math.ceil(lambda_star / lower_bound)
+
+def rr_influence_maximization(filename: str, k: int, prob: float = PROB_OF_BEING_INFECTED, epsilon: float = EPSILON, ell: float = ELL, theta: int = None, seed=None) -> list[int]:
+    '''
+    function that choose k seeds by maximum coverage of RR sets, an alternative to influence_maximization
+    input: filename is the name of the file containing the graph, k is the number of seeds, prob is the probability of
+    being infected by a message, epsilon and ell are the accuracy of IMM, theta is the number of RR sets (if it is passed,
+    the bounds of IMM are not used), seed is the root seed of the sampling
+    output: seed set, in the order of selection
+    '''
+    rr_sets = RRSets(filename, prob, seed)
+    if theta is None:
+        theta = imm_theta(rr_sets, k, epsilon, ell)
+    rr_sets.extend(theta)
+
+    seed_set, fraction = rr_sets.max_coverage(k)
+    print(f"Estimated spread of the seed set: {rr_sets.dataset.num_nodes * fraction:.2f} ({len(rr_sets)} RR sets)")
+    return seed_set
+
+# ---------------------------- MAIN ----------------------------
+
+if __name__ == "__main__":
+    filename = 'data/email.txt'
+    seed = rr_influence_maximization(filename, 4)
+    print(seed)
@@ -1,4 +1,12 @@
-import random
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+from itertools import repeat
+import math
+
+import numpy as np
+
+from loader import attach_datasets, load_dataset, shared_datasets
+from infectionKernel import infection_batches, infected_nodes
 
 # creation of a graph from a file
 # data format -> src dst unixts
@@ -16,85 +24,82 @@ PROB_OF_BEING_INFECTED = 0.2
 probability of not being infected: (1 - PROB_OF_BEING_INFECTED)^(number_of_infected_messages)
 '''
 
+# how the windows are measured: window_size + 1 distinct timestamps, window_size seconds or window_size edges
+WINDOW_MODES = ('timestamps', 'duration', 'edges')
+
 class Graph:
     # constructor
     def __init__(self, directed=True):
         self.directed = directed
         
         # initialize adjacency list
-        # create a matrix with 'nodes' rows and columns
-        self.adjacency_list = []
+        # sparse adjacency: adjacency_list[src][dst] is the list of the timestamps of the edges from src to dst
+        self.adjacency_list = dict()
         
     def add_edge(self, src, dst, unixts=1):
-        #self.adjacency_list.update({src: {dst: unixts}})
-        if len(self.adjacency_list) <= src:
-            for _ in range(src - len(self.adjacency_list) + 1):
-                self.adjacency_list.append([])
-        
-        if len(self.adjacency_list[src]) <= dst:
-            for _ in range(dst - len(self.adjacency_list[src]) + 1):
-                self.adjacency_list[src].append([])
-                
-        self.adjacency_list[src][dst].append(unixts)
+        self.adjacency_list.setdefault(src, dict()).setdefault(dst, []).append(unixts)
         
         if not self.directed:
-            if len(self.adjacency_list) <= dst:
-                for _ in range(dst - len(self.adjacency_list) + 1):
-                    self.adjacency_list.append([])
-        
-            if len(self.adjacency_list[dst]) <= src:
-                for _ in range(src - len(self.adjacency_list[dst]) + 1):
-                    self.adjacency_list[dst].append([])
-                    
-            self.adjacency_list[dst][src].append(unixts)
+            self.adjacency_list.setdefault(dst, dict()).setdefault(src, []).append(unixts)
     
     def print_graph(self):
-        for src in range (len(self.adjacency_list)):
-            for dst in range (len(self.adjacency_list[src])):
-                if self.adjacency_list[src][dst] != []:
-                    print(src, dst, self.adjacency_list[src][dst])
+        for src in sorted(self.adjacency_list):
+            for dst in sorted(self.adjacency_list[src]):
+                print(src, dst, self.adjacency_list[src][dst])
     
     def clear(self):
-        return Graph()
+        return Graph(self.directed)
     
     def get_nodes(self):
-        return set(range(len(self.adjacency_list)))
+        # the nodes that have at least one edge in the adjacency list
+        return set(self.adjacency_list)
     
     def get_node_degree(self, node):
-        edges = 0
-        for dst in range (len(self.adjacency_list[node])):
-            if self.adjacency_list[node][dst] != []:
-                edges += 1
-        return edges
+        # number of distinct neighbours of the node
+        return len(self.adjacency_list.get(node, ()))
 
 # i need to create a graph for each window
 # it's important to preserve each edge timestamp
-def create_temporal_windows(filename, window_size=1000):
+# a window contains the edges of window_size + 1 consecutive timestamps, of window_size seconds or window_size edges
+def window_offsets(dataset, window_size=1000, window_by='timestamps', exact_timestamps=False):
+    '''
+    function that split the edges in windows, with a single pass over the timestamps
+    Input: dataset is the TemporalDataset of the graph, window_size is the size of each window, measured as said by
+    window_by: window_size + 1 distinct timestamps ('timestamps'), seconds from the first timestamp ('duration', the windows
+    without edges are skipped) or number of edges ('edges'). with exact_timestamps a 'timestamps' window holds exactly
+    window_size timestamps and no edge of the next one
+    Output: array of positions, the edges of the window i are the ones from offsets[i] to offsets[i + 1]
+    '''
+    if window_by == 'timestamps' and exact_timestamps:
+        offsets = dataset.batch_offsets[::window_size]
+    elif window_by == 'timestamps':
+        # a window is closed by the first edge of its (window_size + 2)-th timestamp, and that edge stays in the window
+        offsets = np.concatenate(([0], dataset.batch_offsets[window_size + 1:dataset.num_batches:window_size + 1] + 1))
+    elif window_by == 'duration':
+        windows = (dataset.unixts - dataset.unixts[0]) // window_size if len(dataset) > 0 else dataset.unixts
+        offsets = np.concatenate(([0], np.flatnonzero(np.diff(windows)) + 1))
+    elif window_by == 'edges':
+        offsets = np.arange(0, max(1, len(dataset)), window_size)
+    else:
+        raise ValueError(f"unknown window mode {window_by}, it should be one of {WINDOW_MODES}")
+
+    if offsets[-1] != len(dataset):
+        offsets = np.append(offsets, len(dataset))
+    return offsets
+
+def create_temporal_windows(filename, window_size=1000, window_by='timestamps', exact_timestamps=False):
+    dataset = load_dataset(filename)
+    src_ids, dst_ids, timestamps = dataset.columns()
+    offsets = window_offsets(dataset, window_size, window_by, exact_timestamps).tolist()
+
     graph_set = []
-    current_time = 0
-    last_unixts = None
-    with open(filename, 'r') as f:
+    for start, end in zip(offsets, offsets[1:]):
         G = Graph()
-        split_char = ' '
-        if filename == 'data/fb-forum.txt':
-            split_char = ','
-        for line in f:
-            src, dst, unixts = line.split(split_char)
-            src, dst, unixts = int(src), int(dst), int(unixts)
-            G.add_edge(src, dst, unixts=unixts)
-            if last_unixts != None and last_unixts != unixts:
-                if current_time == window_size:
-                    current_time = 0
-                    graph_set.append(G)
-                    G = G.clear()
-                else:
-                    current_time += 1
-            last_unixts = unixts
+        for position in range(start, end):
+            G.add_edge(src_ids[position], dst_ids[position], unixts=timestamps[position])
         graph_set.append(G)
     return graph_set
 
-
-
 def spread_infection(seed, filename, prob: float):
     '''
     Spread the infection in the temporal network
@@ -102,63 +107,9 @@ def spread_infection(seed, filename, prob: float):
     Output: number of infected nodes
     '''
     
-    list_queue = []
-    infected = seed
-    last_unixts = None
-    with open(filename, 'r') as f:
-        split_char = ' '
-        if filename == 'data/fb-forum.txt':
-            split_char = ','
-        for line in f:
-            src, dst, unixts = line.split(split_char)
-            src, dst, unixts = int(src), int(dst), int(unixts)
-            
-            # if the source of the message is infected, the message is infected too
-            if src in infected:
-                state = 1
-            else :
-                state = 0
-            
-            # check if the last_unixts is none or equal to unixts
-            # if is equal, we'll continue to add element on the queue
-            # if is None or different, clear the queue
-            if last_unixts != None and last_unixts != unixts:
-                current_node = 0
-                
-                for list in list_queue:
-                    if list != [] and current_node not in infected:
-                        """
-                        proviouse version in which we used to choose a random message and check if it was infected
-                        random_message = random.choice(list)
-                        if random_message == 1:
-                            infected.append(current_node) """
-                            
-                        # probability of not being infected is equal to (1 - PROB_OF_BEING_INFECTED)^(INFECTED_MESSAGES)
-                        infected_messages = sum(list)
-                        prob_of_not_being_infected = pow((1 - prob), infected_messages)
-                        result_infection = random.uniform(0, 1)
-                        # if the obtained result is greater than the probability of not being infected then the nose is infected
-                        if (result_infection > prob_of_not_being_infected):
-                            infected.append(current_node)
-                    current_node += 1
-                list_queue.clear()
-            
-            # add the message to the destination queue
-            # if the destination is already in the list, add the message to the queue
-            if len(list_queue) > dst:
-                list_queue[dst].append(state)
-            else:
-                # else create a new queue
-                queue = []
-                queue.append(state)
-                if len(list_queue) <= dst:
-                        for _ in range(dst - len(list_queue) + 1):
-                            list_queue.append([])
-                list_queue[dst] = queue 
-            
-            last_unixts = unixts
-    
-    return len(infected)
+    # a node that receives k infected messages with the same unixts is infected with probability 1 - (1 - prob)^k
+    infected_at = infection_batches(load_dataset(filename), set(seed), prob)
+    return len(infected_nodes(infected_at))
 
 # find the seed set for the epidemic in a temporal graph
 def find_seed_set(graph, k=1):
@@ -172,7 +123,8 @@ def find_seed_set(graph, k=1):
     for _ in range(k):
         best_degree = 0
         node = None
-        for v in graph.get_nodes() - set(S):
+        # the nodes are visited by id, so the ties are won by the smallest id
+        for v in sorted(graph.get_nodes() - set(S)):
             
             # get the degree of the node
             degree = graph.get_node_degree(v)
@@ -186,12 +138,61 @@ def find_seed_set(graph, k=1):
         
     return S
 
-def influence_maximization(filename: str, prob: float = PROB_OF_BEING_INFECTED):
-    windows = create_temporal_windows(filename)
+def window_degrees(dataset, start, end):
+    '''
+    function that count the degree of the nodes in a window, without building its graph
+    Input: dataset is the TemporalDataset of the graph, start and end are the positions of the edges of the window
+    Output: the sorted array of the nodes that send a message in the window and the array with the number of distinct
+    nodes to which each one sends a message (the cost depends only on the edges of the window)
+    '''
+    # each distinct (src, dst) pair of the window is counted once
+    pairs = np.unique(dataset.src[start:end].astype(np.int64) * dataset.num_nodes + dataset.dst[start:end])
+    return np.unique(pairs // dataset.num_nodes, return_counts=True)
+
+def top_degree_nodes(dataset, start, end, k=1):
+    '''
+    function that return the k nodes with the highest degree in a window, selected with a heap over the degrees,
+    the ties are won by the smallest id (the same nodes that find_seed_set chooses in the graph of the window)
+    '''
+    senders, degrees = window_degrees(dataset, start, end)
+    # the ids are negated, so between equal degrees the largest key is the smallest id
+    top = heapq.nlargest(k, zip(degrees.tolist(), (-senders).tolist()))
+    return [-negative_id for _, negative_id in top]
+
+def windows_seeds(filename: str, windows: list, k: int = 1):
+    '''
+    function that return the seeds of each window, it is also the task of the worker processes of influence_maximization
+    Input: filename is the name of the file, windows is the list of (start, end) positions of the windows, k is the number of seeds of each window
+    '''
+    dataset = load_dataset(filename)
+    return [top_degree_nodes(dataset, start, end, k) for start, end in windows]
+
+def influence_maximization(filename: str, prob: float = PROB_OF_BEING_INFECTED, window_size: int = 1000, workers: int = 1, window_by: str = 'timestamps', k: int = 1, exact_timestamps: bool = False):
+    '''
+    function that choose k seeds for each window of the graph: the nodes with the highest degree in the window
+    the windows (see window_offsets) are slices of the edge arrays, so no graph is built; with workers > 1 the windows
+    are split in contiguous groups that are processed in parallel on the shared edge arrays
+    Output: seed set, in the order of the windows and without duplicates
+    '''
+    dataset = load_dataset(filename)
+    offsets = window_offsets(dataset, window_size, window_by, exact_timestamps).tolist()
+    windows = list(zip(offsets, offsets[1:]))
+
+    if workers <= 1 or len(windows) <= 1:
+        seeds = windows_seeds(filename, windows, k)
+    else:
+        size = math.ceil(len(windows) / workers)
+        groups = [windows[first:first + size] for first in range(0, len(windows), size)]
+        with shared_datasets([filename]) as handles:
+            with ProcessPoolExecutor(max_workers=len(groups), initializer=attach_datasets, initargs=(handles,)) as executor:
+                # map returns the groups in window order
+                seeds = [window for group in executor.map(windows_seeds, repeat(filename), groups, repeat(k)) for window in group]
+
     seed_set = []
-    for window in windows:
-        if find_seed_set(window)[0] not in seed_set:
-            seed_set.append(find_seed_set(window)[0])
+    for window in seeds:
+        for seed in window:
+            if seed not in seed_set:
+                seed_set.append(seed)
     return seed_set
 
 # ---------------------------- MAIN ----------------------------